@@ -23,7 +23,6 @@ TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 """
 import os
-import subprocess
 import sys
 import time
 import importlib.resources
@@ -36,12 +35,14 @@ import debmake.debs
 import debmake.debug
 import debmake.dist
 import debmake.kludge
+import debmake.lc
 import debmake.origtar
 import debmake.para
 import debmake.sanity
-import debmake.scanfiles
 import debmake.tar
+import debmake.timing
 import debmake.untar
+import debmake.watch
 
 
 #######################################################################
@@ -75,6 +76,10 @@ def main():
     para["override"] = set()
     para = debmake.para.para(para)
     debmake.debug.debug_para("Dp: @post-para para[*]", para)
+    if para["timings"] is not None:
+        debmake.timing.enable(para["timings"])
+    if para["lc_profile"] is not None:
+        debmake.lc.profile_enable(para["lc_profile"])
     #######################################################################
     # -v: print version and copyright notice
     #######################################################################
@@ -107,19 +112,42 @@ def main():
             "I: scan source for copyright+license text and file extensions",
             file=sys.stderr,
         )
-        (
-            nonlink_files,
-            xml_html_files,
-            binary_files,
-            huge_files,
-            _,
-            _,
-        ) = debmake.scanfiles.scanfiles()
-        data = debmake.checkdep5.checkdep5(
-            nonlink_files, mode=para["copyright"], pedantic=para["pedantic"]
-        )
-        print(
-            debmake.copyright.copyright(
+        # -a: scan members of the tarball in place without extracting it
+        if para["tarball"] and not para["load_scan"]:
+            if not os.path.isfile(para["tarball"]):
+                print(
+                    "E: Non-existing tarball name {}".format(para["tarball"]),
+                    file=sys.stderr,
+                )
+                exit(1)
+            print("I: scan tarball {} in place".format(para["tarball"]), file=sys.stderr)
+        # --watch: keep the output file updated while the source changes
+        if para["watch"]:
+            debmake.watch.watch(para)
+            return
+        with debmake.timing.phase("checkdep5"):
+            (
+                data,
+                (
+                    nonlink_files,
+                    xml_html_files,
+                    binary_files,
+                    huge_files,
+                    _,
+                    _,
+                ),
+            ) = debmake.checkdep5.checkdep5_tree(
+                mode=para["copyright"],
+                pedantic=para["pedantic"],
+                jobs=para["jobs"],
+                cache=para["cache"],
+                verify=para["cache_verify"],
+                tarball=para["tarball"],
+                save=para["save_scan"],
+                load=para["load_scan"],
+            )
+        with debmake.timing.phase("copyright"):
+            text = debmake.copyright.copyright(
                 "package",
                 set(),
                 data,
@@ -129,20 +157,30 @@ def main():
                 mode=para["copyright"],
                 tutorial=para["tutorial"],
             )
-        )
+        print(text)
         return
     #######################################################################
     # -k: compare debian/copyright with the source and exit
     #######################################################################
     if para["kludge"] != 0:
         print("I: compare debian/copyright with the source", file=sys.stderr)
-        debmake.kludge.kludge(para["kludge"], para["pedantic"])
+        with debmake.timing.phase("kludge"):
+            debmake.kludge.kludge(
+                para["kludge"],
+                para["pedantic"],
+                jobs=para["jobs"],
+                cache=para["cache"],
+                verify=para["cache_verify"],
+                save=para["save_scan"],
+                load=para["load_scan"],
+            )
         return
     #######################################################################
     # sanity check parameters without digging deep into source tree
     #######################################################################
     print("I: sanity check of parameters", file=sys.stderr)
-    para = debmake.sanity.sanity(para)
+    with debmake.timing.phase("sanity"):
+        para = debmake.sanity.sanity(para)
     debmake.debug.debug_para("Dp: @post-sanity para[*]", para)
     print(
         'I: pkg="{}", ver="{}", rev="{}"'.format(
@@ -157,7 +195,8 @@ def main():
         print(
             'I: make the upstream tarball with "make dist" equivalents', file=sys.stderr
         )
-        para = debmake.dist.dist(para)
+        with debmake.timing.phase("dist"):
+            para = debmake.dist.dist(para)
         debmake.debug.debug_para("Dp: @post-dist para[*]", para)
         print(
             'I: pkg="{}", ver="{}", rev="{}"'.format(
@@ -172,24 +211,31 @@ def main():
         print(
             'I: make the upstream tarball with "tar --exclude=debian"', file=sys.stderr
         )
-        debmake.tar.tar(
-            para["tarball"], para["targz"], para["srcdir"], para["parent"], para["yes"]
-        )
+        with debmake.timing.phase("tar"):
+            debmake.tar.tar(
+                para["tarball"],
+                para["targz"],
+                para["srcdir"],
+                para["parent"],
+                para["yes"],
+                copy=(para["tar"] >= 2),
+            )
         debmake.debug.debug_para("Dp: @post-tar para[*]", para)
     #######################################################################
     # -a, -d: extract archive from tarball (tar -xvzf)
     #######################################################################
     if para["archive"] or para["dist"]:
         print("I: untar the upstream tarball", file=sys.stderr)
-        debmake.untar.untar(
-            para["tarball"],
-            para["targz"],
-            para["srcdir"],
-            para["dist"],
-            para["tar"],
-            para["parent"],
-            para["yes"],
-        )
+        with debmake.timing.phase("untar"):
+            debmake.untar.untar(
+                para["tarball"],
+                para["targz"],
+                para["srcdir"],
+                para["dist"],
+                para["tar"],
+                para["parent"],
+                para["yes"],
+            )
         debmake.debug.debug_para("Dp: @post-untar para[*]", para)
     #######################################################################
     # always: generate orig tarball if missing and non-native package
@@ -211,13 +257,14 @@ def main():
             file=sys.stderr,
         )
         # ln -sf parent/dist/Foo-1.0.tar.gz foo_1.0.orig.tar.gz
-        debmake.origtar.origtar(
-            para["package"],
-            para["version"],
-            para["targz"],
-            para["tarball"],
-            para["parent"],
-        )
+        with debmake.timing.phase("origtar"):
+            debmake.origtar.origtar(
+                para["package"],
+                para["version"],
+                para["targz"],
+                para["tarball"],
+                para["parent"],
+            )
         para["tarball"] = (
             para["package"] + "_" + para["version"] + ".orig." + para["targz"]
         )
@@ -235,12 +282,14 @@ def main():
         "I: parse binary package settings: {}".format(para["binaryspec"]),
         file=sys.stderr,
     )
-    para["debs"] = debmake.debs.debs(
-        para["binaryspec"], para["package"], para["monoarch"], para["dh_with"]
-    )
+    with debmake.timing.phase("debs"):
+        para["debs"] = debmake.debs.debs(
+            para["binaryspec"], para["package"], para["monoarch"], para["dh_with"]
+        )
     debmake.debug.debug_debs("Dd: para['debs'] =>", para["debs"])
     print("I: analyze the source tree", file=sys.stderr)
-    para = debmake.analyze.analyze(para)
+    with debmake.timing.phase("analyze"):
+        para = debmake.analyze.analyze(para)
     debmake.debug.debug_para("Dp: @post-analyze para[*]", para)
     # debmake.gui()          # GUI setting
     # debmake.debug.debug_para('Dp: @post-gui para[*]', para)
@@ -248,7 +297,8 @@ def main():
     # Make debian/* package files
     #######################################################################
     print("I: make debian/* template files", file=sys.stderr)
-    debmake.debian.debian(para)
+    with debmake.timing.phase("debian"):
+        debmake.debian.debian(para)
     #######################################################################
     # Make Debian package(s)
     #######################################################################
@@ -257,14 +307,14 @@ def main():
             para["package"]
         )
         print("I: $ {}".format(command), file=sys.stderr)
-        if subprocess.call(command, shell=True) != 0:
+        if debmake.timing.call(command, shell=True) != 0:
             print("E: failed to run dpkg-depcheck.", file=sys.stderr)
             exit(1)
         command = r'LANG=C ; sed -e "1d" < ../{0}.depcheck.log | sort >../{0}.build-dep.log'.format(
             para["package"]
         )
         print("I: $ {}".format(command), file=sys.stderr)
-        if subprocess.call(command, shell=True) != 0:
+        if debmake.timing.call(command, shell=True) != 0:
             print("E: failed to run sort on build-dep.", file=sys.stderr)
             exit(1)
         if len(para["debs"]) == 1:
@@ -277,7 +327,7 @@ def main():
                 + r'\///" | sort >../{0}.install.log'.format(para["package"])
             )
             print("I: $ {}".format(command), file=sys.stderr)
-            if subprocess.call(command, shell=True) != 0:
+            if debmake.timing.call(command, shell=True) != 0:
                 print(
                     "E: failed to run find debian/{}.".format(bpackage), file=sys.stderr
                 )
@@ -287,7 +337,7 @@ def main():
                 para["package"]
             )
             print("I: $ {}".format(command), file=sys.stderr)
-            if subprocess.call(command, shell=True) != 0:
+            if debmake.timing.call(command, shell=True) != 0:
                 print("E: failed to run find debian/tmp.", file=sys.stderr)
                 exit(1)
         else:
@@ -311,7 +361,7 @@ def main():
         )
     elif para["invoke"]:
         print("I: {}".format(para["invoke"]), file=sys.stderr)
-        if subprocess.call(para["invoke"], shell=True) != 0:
+        if debmake.timing.call(para["invoke"], shell=True) != 0:
             print("E: failed to build Debian package(s).", file=sys.stderr)
             exit(1)
         if para["archive"]:
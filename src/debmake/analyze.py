@@ -32,6 +32,7 @@ import debmake.grep
 import debmake.read
 import debmake.checkdep5
 import debmake.scanfiles
+import debmake.timing
 import debmake.yn
 
 ###########################################################################
@@ -88,13 +89,15 @@ def popular(exttype, msg, debs, extcountlist, yes):
 def description(type, data_path):
     text = ""
     command = data_path + type + ".short.sh"
-    p = subprocess.Popen(
-        command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
-    )
-    if p.stdout is not None:
-        for line in p.stdout.readlines():
-            text += line.decode("utf-8").strip() + " "
-    if p.wait() != 0:
+    with debmake.timing.command_phase(command):
+        p = subprocess.Popen(
+            command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+        )
+        if p.stdout is not None:
+            for line in p.stdout.readlines():
+                text += line.decode("utf-8").strip() + " "
+        p.wait()
+    if p.returncode != 0:
         print('E: "{}" returns "{}"'.format(command, p.returncode), file=sys.stderr)
         exit(1)
     return text.strip()
@@ -106,17 +109,19 @@ def description(type, data_path):
 def description_long(type, data_path):
     text = ""
     command = data_path + type + ".long.sh"
-    p = subprocess.Popen(
-        command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
-    )
-    if p.stdout is not None:
-        for line in p.stdout.readlines():
-            l_chomp = line.decode("utf-8").rstrip()
-            if l_chomp:
-                text += " " + l_chomp + "\n"
-            else:
-                text += " .\n"
-    if p.wait() != 0:
+    with debmake.timing.command_phase(command):
+        p = subprocess.Popen(
+            command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+        )
+        if p.stdout is not None:
+            for line in p.stdout.readlines():
+                l_chomp = line.decode("utf-8").rstrip()
+                if l_chomp:
+                    text += " " + l_chomp + "\n"
+                else:
+                    text += " .\n"
+        p.wait()
+    if p.returncode != 0:
         print('E: "{}" returns "{}"'.format(command, p.returncode), file=sys.stderr)
         exit(1)
     if text == " .\n":
@@ -476,6 +481,27 @@ def analyze(para):
     print(
         "I: scan source for copyright+license text and file extensions", file=sys.stderr
     )
+    # skip slow license+copyright check if debian/copyright exists
+    # unless the scan is saved to or loaded from a snapshot
+    if os.path.isfile("debian/copyright") and not (
+        para["save_scan"] or para["load_scan"]
+    ):
+        para["cdata"] = []
+        with debmake.timing.phase("scanfiles"):
+            scanned = debmake.scanfiles.scanfiles()
+    else:
+        with debmake.timing.phase("checkdep5"):
+            (para["cdata"], scanned) = debmake.checkdep5.checkdep5_tree(
+                mode=2,
+                pedantic=para["pedantic"],
+                jobs=para["jobs"],
+                cache=para["cache"],
+                verify=para["cache_verify"],
+                save=para["save_scan"],
+                load=para["load_scan"],
+            )
+        if os.path.isfile("debian/copyright"):
+            para["cdata"] = []
     (
         para["nonlink_files"],
         para["xml_html_files"],
@@ -483,14 +509,7 @@ def analyze(para):
         para["huge_files"],
         para["extcount"],
         para["extcountlist"],
-    ) = debmake.scanfiles.scanfiles()
-    # skip slow license+copyright check if debian/copyright exists
-    if os.path.isfile("debian/copyright"):
-        para["cdata"] = []
-    else:
-        para["cdata"] = debmake.checkdep5.checkdep5(
-            para["nonlink_files"], mode=2, pedantic=para["pedantic"]
-        )
+    ) = scanned
     #######################################################################
     # compiler: set build dependency etc. if they are used
     if "c" in para["extcount"].keys():
@@ -0,0 +1,301 @@
+#!/usr/bin/python3
+# vim:se tw=0 sts=4 ts=4 et ai:
+"""
+Copyright © 2024 Osamu Aoki
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the
+"Software"), to deal in the Software without restriction, including
+without limitation the rights to use, copy, modify, merge, publish,
+distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to
+the following conditions:
+
+The above copyright notice and this permission notice shall be included
+in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+import debmake
+import debmake.debug
+
+###################################################################
+# Persistent scan cache under $XDG_CACHE_HOME/debmake
+###################################################################
+# files: (copyright_data, license_lines) = parse_encoded_lines(file)
+#        keyed by real path, name and options, validated by size, mtime,
+#        inode (+ digest).  The name as given is part of the key since the
+#        result depends on it (e.g., lines starting with the file name).
+# licenses: debmake.lc.lc_classify(norm_text)
+#        keyed by md5 of norm_text, shared between all source trees
+# Any change of the scan rules (checkdep5.py, lc.py) or of debmake itself
+# changes the fingerprint and invalidates all cached data automatically.
+# License classification depends only on lc.py.
+# A file is stored with the stat data taken by get_file() before it is
+# parsed.  A file modified since shortly before the cache was opened may
+# have been read by the tree walker before that stat and is not stored.
+# Results are committed after each batch of writes so the database is not
+# locked for other processes during the scan.  Some entries of files no
+# longer existing are removed each time the cache is closed.
+###################################################################
+CACHE_VERSION = 3  # bump if the database schema changes
+CACHE_FILE = "scan.sqlite3"
+RULE_FILES = ["checkdep5.py", "lc.py"]
+LC_RULE_FILES = ["lc.py"]
+RACY_NS = 2 * 1000000000  # file timestamp granularity margin (FAT: 2 s)
+PRUNE_PATHS = 1000  # paths checked for removed files when closing the cache
+
+
+def get_cache_dir():
+    xdg_cache_home = os.environ.get("XDG_CACHE_HOME", "")
+    if not xdg_cache_home:
+        xdg_cache_home = os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(xdg_cache_home, "debmake")
+
+
+def get_fingerprint(rule_files=RULE_FILES):
+    # fingerprint of the rule set used to generate cached data
+    md5hash = hashlib.md5()
+    md5hash.update("{}:{}".format(debmake.__version__, CACHE_VERSION).encode())
+    for rule_file in rule_files:
+        with open(os.path.join(os.path.dirname(__file__), rule_file), "rb") as f:
+            md5hash.update(f.read())
+    return md5hash.hexdigest()
+
+
+def open_cache(verify=False, cache_dir=""):
+    # return cache (dictionary) or None if the cache is not usable
+    # verify: check the content digest of files in addition to stat data
+    if not cache_dir:
+        cache_dir = get_cache_dir()
+    path = os.path.join(cache_dir, CACHE_FILE)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        db = sqlite3.connect(path, timeout=60)
+        if db.execute("PRAGMA user_version").fetchone()[0] != CACHE_VERSION:
+            db.execute("DROP TABLE IF EXISTS files")
+            db.execute("DROP TABLE IF EXISTS licenses")
+            db.execute("PRAGMA user_version = {}".format(CACHE_VERSION))
+        db.execute(
+            """CREATE TABLE IF NOT EXISTS files (
+                path TEXT,
+                name TEXT,
+                options TEXT,
+                fingerprint TEXT,
+                size INTEGER,
+                mtime INTEGER,
+                inode INTEGER,
+                digest TEXT,
+                result TEXT,
+                PRIMARY KEY (path, name, options))"""
+        )
+        db.execute(
+            """CREATE TABLE IF NOT EXISTS licenses (
+                key TEXT PRIMARY KEY,
+                fingerprint TEXT,
+                result TEXT)"""
+        )
+        fingerprint = get_fingerprint()
+        lc_fingerprint = get_fingerprint(LC_RULE_FILES)
+        db.execute("DELETE FROM files WHERE fingerprint != ?", (fingerprint,))
+        db.execute("DELETE FROM licenses WHERE fingerprint != ?", (lc_fingerprint,))
+        db.commit()
+    except (OSError, sqlite3.Error) as e:
+        print("W: scan cache disabled: {}: {}".format(path, e), file=sys.stderr)
+        return None
+    debmake.debug.debug("Dh: open scan cache: {}".format(path), type="h")
+    cache = {}
+    cache["db"] = db
+    cache["path"] = path
+    cache["fingerprint"] = fingerprint
+    cache["lc_fingerprint"] = lc_fingerprint
+    cache["verify"] = verify
+    cache["start"] = time.time_ns()  # before any file is read for the scan
+    cache["stat"] = {}  # stat data of files missed by get_file()
+    cache["hit"] = 0
+    cache["miss"] = 0
+    cache["license_hit"] = 0
+    cache["license_miss"] = 0
+    return cache
+
+
+def commit_cache(cache):
+    # commit the writes so far and release the write lock of the database
+    if cache is None:
+        return
+    try:
+        cache["db"].commit()
+    except sqlite3.Error as e:
+        print(
+            "W: scan cache not saved: {}: {}".format(cache["path"], e), file=sys.stderr
+        )
+    return
+
+
+def prune_cache(cache):
+    # remove the entries of some files which no longer exist
+    db = cache["db"]
+    paths = db.execute(
+        "SELECT DISTINCT path FROM files ORDER BY RANDOM() LIMIT ?", (PRUNE_PATHS,)
+    ).fetchall()
+    removed = [(path,) for (path,) in paths if not os.path.exists(path)]
+    db.executemany("DELETE FROM files WHERE path = ?", removed)
+    if removed:
+        debmake.debug.debug(
+            "Dh: prune scan cache: {} files".format(len(removed)), type="h"
+        )
+    return
+
+
+def close_cache(cache):
+    if cache is None:
+        return
+    try:
+        prune_cache(cache)
+        cache["db"].commit()
+        cache["db"].close()
+    except sqlite3.Error as e:
+        print(
+            "W: scan cache not saved: {}: {}".format(cache["path"], e), file=sys.stderr
+        )
+    print(
+        "I: scan cache: {} hit, {} miss, license: {} hit, {} miss ({})".format(
+            cache["hit"],
+            cache["miss"],
+            cache["license_hit"],
+            cache["license_miss"],
+            cache["path"],
+        ),
+        file=sys.stderr,
+    )
+    return
+
+
+def get_digest(file):
+    with open(file, "rb") as f:
+        return hashlib.file_digest(f, "md5").hexdigest()
+
+
+###################################################################
+# per-file parse results
+###################################################################
+def get_file(cache, file, options):
+    # return (copyright_data, license_lines) or None if not cached
+    # options: string representing parse options (encoding, pedantic, ...)
+    path = os.path.realpath(file)
+    st = None
+    try:
+        st = os.stat(path)
+        row = cache["db"].execute(
+            "SELECT size, mtime, inode, digest, result FROM files WHERE path = ? AND name = ? AND options = ? AND fingerprint = ?",
+            (path, file, options, cache["fingerprint"]),
+        ).fetchone()
+    except (OSError, sqlite3.Error):
+        row = None
+    if row is None:
+        cache["miss"] += 1
+        if st is not None:
+            cache["stat"][file] = st
+        return None
+    (size, mtime, inode, digest, result) = row
+    if (size, mtime, inode) != (st.st_size, st.st_mtime_ns, st.st_ino) or (
+        cache["verify"] and digest != get_digest(path)
+    ):
+        debmake.debug.debug("Dh: stale scan cache: {}".format(file), type="h")
+        cache["miss"] += 1
+        cache["stat"][file] = st
+        return None
+    (copyright_data, license_lines) = json.loads(result)
+    copyright_data = {name: tuple(years) for name, years in copyright_data.items()}
+    cache["hit"] += 1
+    return (copyright_data, license_lines)
+
+
+def put_file(cache, file, options, copyright_data, license_lines):
+    # store the parse result with the stat data taken before parsing
+    path = os.path.realpath(file)
+    st = cache["stat"].pop(file, None)
+    if st is None:
+        return  # not looked up by get_file() before parsing
+    if st.st_mtime_ns >= cache["start"] - RACY_NS:
+        debmake.debug.debug("Dh: skip racy scan cache: {}".format(file), type="h")
+        return
+    try:
+        if cache["verify"]:
+            digest = get_digest(path)
+        else:
+            digest = None
+        cache["db"].execute(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                path,
+                file,
+                options,
+                cache["fingerprint"],
+                st.st_size,
+                st.st_mtime_ns,
+                st.st_ino,
+                digest,
+                json.dumps([copyright_data, license_lines], ensure_ascii=False),
+            ),
+        )
+    except (OSError, sqlite3.Error) as e:
+        debmake.debug.debug("Dh: skip scan cache: {}: {}".format(file, e), type="h")
+    return
+
+
+###################################################################
+# license classification results (mode independent)
+###################################################################
+def get_license(cache, key):
+    # return data of debmake.lc.lc_classify() or None if not cached
+    # key: md5 of the normalized license text
+    try:
+        row = cache["db"].execute(
+            "SELECT result FROM licenses WHERE key = ? AND fingerprint = ?",
+            (key, cache["lc_fingerprint"]),
+        ).fetchone()
+    except sqlite3.Error:
+        row = None
+    if row is None:
+        cache["license_miss"] += 1
+        return None
+    data = json.loads(row[0])
+    if data[4] is not None:
+        data[4] = tuple(data[4])  # exception
+    cache["license_hit"] += 1
+    return tuple(data)
+
+
+def put_license(cache, key, data):
+    # match_text and norm_text are only for debug and not stored
+    data = list(data[:8]) + ["", ""]
+    try:
+        cache["db"].execute(
+            "INSERT OR REPLACE INTO licenses VALUES (?, ?, ?)",
+            (key, cache["lc_fingerprint"], json.dumps(data, ensure_ascii=False)),
+        )
+    except sqlite3.Error as e:
+        debmake.debug.debug("Dh: skip license cache: {}: {}".format(key, e), type="h")
+    return
+
+
+#######################################################################
+# Test script
+#######################################################################
+if __name__ == "__main__":
+    print("cache dir:   {}".format(get_cache_dir()))
+    print("fingerprint: {}".format(get_fingerprint()))
+    print("lc rules:    {}".format(get_fingerprint(LC_RULE_FILES)))
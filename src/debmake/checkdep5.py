@@ -22,15 +22,28 @@ CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
 TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 """
+import argparse
+import codecs
+import collections
+import concurrent.futures
+import contextlib
 import hashlib
+import io
 import itertools
+import json
 import operator
 import os
 import re
 import sys
+import threading
+import time
 import debmake
+import debmake.cache
 import debmake.debug
 import debmake.lc
+import debmake.scanfiles
+import debmake.snapshot
+import debmake.timing
 
 ###################################################################
 # Constants for sanity
@@ -47,6 +60,9 @@ MAX_LICENSE_LINE_LENGTH = 1024  # chars
 MAX_LICENSE_LINES = 1024  # lines
 MAX_NON_ASCII = 0.25  # ratio
 MAX_BAD_LINES = 4  # lines
+READ_SIZE = 16 * 1024  # bytes read at once by read_lines()
+STREAM_CHUNK_SIZE = 8  # files sent at once to a worker by parse_stream_files()
+STREAM_INFLIGHT = 2  # chunks per job in flight in parse_stream_files()
 ###################################################################
 # parse_lines() uses following state parameters to scan and extract
 # in its MAIN-LOOP to generate:
@@ -605,12 +621,13 @@ def check_format_style(line, xformat_state, persistent_format):
                 postfix = m.group("postfix")  # for debug output
                 format_state = f
                 break
-    debmake.debug.debug(
-        'Ds: format={}->{}, prefix="{}", postfix="{}": "{}"'.format(
-            fs[xformat_state], fs[format_state], prefix, postfix, line
-        ),
-        type="s",
-    )
+    if debmake.debug.enabled("s"):
+        debmake.debug.debug(
+            'Ds: format={}->{}, prefix="{}", postfix="{}": "{}"'.format(
+                fs[xformat_state], fs[format_state], prefix, postfix, line
+            ),
+            type="s",
+        )
     return (line, format_state)
 
 
@@ -675,10 +692,11 @@ def split_years_name(copyright_line, pedantic=False):
         else:
             years = ""
             name = ""
-    debmake.debug.debug(
-        'Dy: years="{}", name="{}" <- "{}"'.format(years, name, copyright_line),
-        type="y",
-    )
+    if debmake.debug.enabled("y"):
+        debmake.debug.debug(
+            'Dy: years="{}", name="{}" <- "{}"'.format(years, name, copyright_line),
+            type="y",
+        )
     return (years, name)
 
 
@@ -909,7 +927,11 @@ def content_string(content):
 ##########################################################################
 # Main text process loop over lines
 ##########################################################################
-def parse_lines(lines, file, utf8=True, pedantic=False):
+def parse_lines(lines, file, utf8=True, pedantic=False, decoding=None):
+    # utf8: lines are decoded as UTF-8 (not latin-1)
+    # decoding: {"utf8": utf8} updated by read_lines() while lines are read
+    if decoding is None:
+        decoding = {"utf8": utf8}
     persistent_format = all_formats
     valid_lines = 0  # increment if COPY or LICN found
     format_state = F_PLAIN0
@@ -919,6 +941,11 @@ def parse_lines(lines, file, utf8=True, pedantic=False):
     copyright_lines = []
     license_lines = []
     author_lines = []
+    # debug flags checked once outside of MAIN-LOOP
+    debug_a = debmake.debug.enabled("a")
+    debug_b = debmake.debug.enabled("b")
+    debug_e = debmake.debug.enabled("e")
+    debug_m = debmake.debug.enabled("m")
     ##########################################################################
     # MAIN-LOOP for lines (start)
     ##########################################################################
@@ -926,16 +953,17 @@ def parse_lines(lines, file, utf8=True, pedantic=False):
         # set previous values
         xformat_state = format_state
         xcontent_state = content_state
-        debmake.debug.debug(
-            'Db: begin xformat={}, xcontent={}, format_found={}, content_found={}: "{}"'.format(
-                fs[xformat_state],
-                cs[xcontent_state],
-                format_string(format_found),
-                content_string(content_found),
-                line,
-            ),
-            type="b",
-        )
+        if debug_b:
+            debmake.debug.debug(
+                'Db: begin xformat={}, xcontent={}, format_found={}, content_found={}: "{}"'.format(
+                    fs[xformat_state],
+                    cs[xcontent_state],
+                    format_string(format_found),
+                    content_string(content_found),
+                    line,
+                ),
+                type="b",
+            )
         if i > MAX_TOTAL_LINES:
             if license_lines != []:
                 license_lines.append(
@@ -943,6 +971,7 @@ def parse_lines(lines, file, utf8=True, pedantic=False):
                         i, line[0:NORMAL_LINE_LENGTH]
                     )
                 )
+            break
         # ------------------------------------------------------------------
         # pre-process line
         # ------------------------------------------------------------------
@@ -958,7 +987,7 @@ def parse_lines(lines, file, utf8=True, pedantic=False):
                 )
                 # license_lines.append("__INITIAL_LONG_LINE__ (binary file?)")
                 break
-            if not utf8:
+            if not decoding["utf8"]:
                 n_non_ascii = len_non_ascii(line)
                 if (n * MAX_NON_ASCII) < n_non_ascii:
                     copyright_lines.append(
@@ -992,39 +1021,46 @@ def parse_lines(lines, file, utf8=True, pedantic=False):
         # ------------------------------------------------------------------
         # ending ?
         if re_license_end_always.search(line):  # end no matter what
-            debmake.debug.debug('Dm: license_end_always: "{}"'.format(line), type="m")
+            if debug_m:
+                debmake.debug.debug('Dm: license_end_always: "{}"'.format(line), type="m")
             break
         elif xcontent_state != C_INIT and re_license_end_no_init.search(line):
-            debmake.debug.debug(
-                'Dm: xcontent_state != C_INIT and license_end_no_init: "{}"'.format(
-                    line
-                ),
-                type="m",
-            )
+            if debug_m:
+                debmake.debug.debug(
+                    'Dm: xcontent_state != C_INIT and license_end_no_init: "{}"'.format(
+                        line
+                    ),
+                    type="m",
+                )
             break
         # blank line
         elif line == "":
             if xcontent_state == C_COPY:
-                debmake.debug.debug("Dm: C_COPY + blank line", type="m")
+                if debug_m:
+                    debmake.debug.debug("Dm: C_COPY + blank line", type="m")
                 content_state = C_COPYB
                 content_found |= {C_COPYB}
             elif xcontent_state == C_LICN:
-                debmake.debug.debug("Dm: C_LICN + blank line", type="m")
+                if debug_m:
+                    debmake.debug.debug("Dm: C_LICN + blank line", type="m")
                 license_lines.append(line)
                 content_state = C_LICNB
                 content_found |= {C_LICNB}
             elif xcontent_state == C_AUTH:
-                debmake.debug.debug("Dm: C_AUTH + blank line", type="m")
+                if debug_m:
+                    debmake.debug.debug("Dm: C_AUTH + blank line", type="m")
                 content_state = C_AUTHB
                 content_found |= {C_AUTHB}
             else:
-                debmake.debug.debug("Dm: repeated blank lines", type="m")
+                if debug_m:
+                    debmake.debug.debug("Dm: repeated blank lines", type="m")
         # starting a new section (C_INIT->... and others->...)
         elif xcontent_state != C_LICN and copyright_start(line):
-            debmake.debug.debug(
-                'Dm: xcontent_state != C_LICN and copyright_start: "{}"'.format(line),
-                type="m",
-            )
+            if debug_m:
+                debmake.debug.debug(
+                    'Dm: xcontent_state != C_LICN and copyright_start: "{}"'.format(line),
+                    type="m",
+                )
             line = copyright_start(line)
             if line:
                 copyright_lines.append(line)
@@ -1033,15 +1069,17 @@ def parse_lines(lines, file, utf8=True, pedantic=False):
             valid_lines += 1
             if valid_lines == 1:  # The first valid line after C_INIT
                 persistent_format = formats[format_state][2]  # set
+                if debug_m:
+                    debmake.debug.debug(
+                        'Dm: persistent: "{}"'.format(format_string(persistent_format)),
+                        type="m",
+                    )
+        elif xcontent_state != C_LICN and author_start(line):  # author_start_sure
+            if debug_m:
                 debmake.debug.debug(
-                    'Dm: persistent: "{}"'.format(format_string(persistent_format)),
+                    'Dm: xcontent_state != C_LICN and author_start: "{}"'.format(line),
                     type="m",
                 )
-        elif xcontent_state != C_LICN and author_start(line):  # author_start_sure
-            debmake.debug.debug(
-                'Dm: xcontent_state != C_LICN and author_start: "{}"'.format(line),
-                type="m",
-            )
             line = author_start(line)
             if line:
                 author_lines.append(line)
@@ -1050,49 +1088,56 @@ def parse_lines(lines, file, utf8=True, pedantic=False):
             valid_lines += 1
             if valid_lines == 1:  # The first valid line after C_INIT
                 persistent_format = formats[format_state][2]  # set
-                debmake.debug.debug(
-                    'Dm: persistent: "{}"'.format(format_string(persistent_format)),
-                    type="m",
-                )
+                if debug_m:
+                    debmake.debug.debug(
+                        'Dm: persistent: "{}"'.format(format_string(persistent_format)),
+                        type="m",
+                    )
         elif license_start(line):
-            debmake.debug.debug('Dm: license_start_sure: "{}"'.format(line), type="m")
+            if debug_m:
+                debmake.debug.debug('Dm: license_start_sure: "{}"'.format(line), type="m")
             license_lines.append(line)
             content_state = C_LICN
             content_found |= {C_LICN}
             valid_lines += 1
             if valid_lines == 1:  # The first valid line after C_INIT
                 persistent_format = formats[format_state][2]  # set
-                debmake.debug.debug(
-                    'Dm: persistent: "{}"'.format(format_string(persistent_format)),
-                    type="m",
-                )
+                if debug_m:
+                    debmake.debug.debug(
+                        'Dm: persistent: "{}"'.format(format_string(persistent_format)),
+                        type="m",
+                    )
             if re_license_end_next.search(line):
                 break
         # special transitions: COPY/AUTH --> LICN
         elif xcontent_state in [C_COPY, C_AUTH] and re_license_maybe.search(line):
-            debmake.debug.debug(
-                'Dm: xcontent_state in [C_INIT, C_COPY, C_AUTH] and license_maybe: "{}"'.format(
-                    line
-                ),
-                type="m",
-            )
+            if debug_m:
+                debmake.debug.debug(
+                    'Dm: xcontent_state in [C_INIT, C_COPY, C_AUTH] and license_maybe: "{}"'.format(
+                        line
+                    ),
+                    type="m",
+                )
             license_lines.append(line)
             content_state = C_LICN
             content_found |= {C_LICN}
         elif xcontent_state == C_LICN:  # line != ''
-            debmake.debug.debug(
-                'Dm: C_LICN + non-blank line: "{}"'.format(line), type="m"
-            )
+            if debug_m:
+                debmake.debug.debug(
+                    'Dm: C_LICN + non-blank line: "{}"'.format(line), type="m"
+                )
             license_lines.append(line)
             content_state = C_LICN
             content_found |= {C_LICN}
         # All C_INIT -> other section transitions have been exhausted
         elif xcontent_state == C_INIT:
-            debmake.debug.debug('Dm: C_INIT cont, ignore: "{}"'.format(line), type="m")
+            if debug_m:
+                debmake.debug.debug('Dm: C_INIT cont, ignore: "{}"'.format(line), type="m")
             content_state = C_INIT
             content_found |= {C_INIT}
         elif xcontent_state == C_COPY:
-            debmake.debug.debug('Dm: copyright_cont: "{}"'.format(line), type="m")
+            if debug_m:
+                debmake.debug.debug('Dm: copyright_cont: "{}"'.format(line), type="m")
             if len(copyright_lines) == 0:
                 copyright_lines = [line]
             elif re_no_year.search(line):
@@ -1106,7 +1151,8 @@ def parse_lines(lines, file, utf8=True, pedantic=False):
             content_state = C_COPY
             content_found |= {C_COPY}
         elif xcontent_state == C_AUTH:
-            debmake.debug.debug('Dm: author_cont: "{}"'.format(line), type="m")
+            if debug_m:
+                debmake.debug.debug('Dm: author_cont: "{}"'.format(line), type="m")
             if len(author_lines) == 0:
                 author_lines = [line]
             elif re_no_year.search(line):
@@ -1120,30 +1166,34 @@ def parse_lines(lines, file, utf8=True, pedantic=False):
             content_state = C_AUTH
             content_found |= {C_AUTH}
         elif xcontent_state == C_AUTH:  # line != ''
-            debmake.debug.debug(
-                'Dm: C_AUTH + non-blank line: "{}"'.format(line), type="m"
-            )
+            if debug_m:
+                debmake.debug.debug(
+                    'Dm: C_AUTH + non-blank line: "{}"'.format(line), type="m"
+                )
             author_lines.append(line)
             content_state = C_AUTH
             content_found |= {C_AUTH}
         elif xcontent_state == C_COPYB:  # line != ''
-            debmake.debug.debug(
-                'Dm: C_COPYB + non-blank line: "{}"'.format(line), type="m"
-            )
+            if debug_m:
+                debmake.debug.debug(
+                    'Dm: C_COPYB + non-blank line: "{}"'.format(line), type="m"
+                )
             license_lines.append(line)
             content_state = C_LICN
             content_found |= {C_LICN}
         elif xcontent_state == C_LICNB:  # line != ''
-            debmake.debug.debug(
-                'Dm: C_LICNB + non-blank line: "{}"'.format(line), type="m"
-            )
+            if debug_m:
+                debmake.debug.debug(
+                    'Dm: C_LICNB + non-blank line: "{}"'.format(line), type="m"
+                )
             license_lines.append(line)
             content_state = C_LICN
             content_found |= {C_LICN}
         elif xcontent_state == C_AUTHB:  # line != ''
-            debmake.debug.debug(
-                'Dm: C_AUTHB + non-blank line: "{}"'.format(line), type="m"
-            )
+            if debug_m:
+                debmake.debug.debug(
+                    'Dm: C_AUTHB + non-blank line: "{}"'.format(line), type="m"
+                )
             license_lines.append(line)
             content_state = C_LICN
             content_found |= {C_LICN}
@@ -1162,18 +1212,19 @@ def parse_lines(lines, file, utf8=True, pedantic=False):
             )
             print("W: !!!!! assertion error, exit loop !!!!!", file=sys.stderr)
             break
-        debmake.debug.debug(
-            'De: *end* format={}->{}, content={}->{}, format_found={}, content_found={}: "{}"'.format(
-                fs[xformat_state],
-                fs[format_state],
-                cs[xcontent_state],
-                cs[content_state],
-                format_string(format_found),
-                content_string(content_found),
-                line,
-            ),
-            type="e",
-        )
+        if debug_e:
+            debmake.debug.debug(
+                'De: *end* format={}->{}, content={}->{}, format_found={}, content_found={}: "{}"'.format(
+                    fs[xformat_state],
+                    fs[format_state],
+                    cs[xcontent_state],
+                    cs[content_state],
+                    format_string(format_found),
+                    content_string(content_found),
+                    line,
+                ),
+                type="e",
+            )
     ##########################################################################
     # MAIN-LOOP (end)
     ##########################################################################
@@ -1185,39 +1236,134 @@ def parse_lines(lines, file, utf8=True, pedantic=False):
     # analyze_copyright and clean_license
     # ------------------------------------------------------------------
     copyright_data = analyze_copyright(
-        copyright_lines, file, utf8=utf8, pedantic=pedantic
+        copyright_lines, file, utf8=decoding["utf8"], pedantic=pedantic
     )
-    license_lines = clean_license(license_lines, file, utf8=utf8)
-    debmake.debug.debug("Da: AUTHOR(s)/TRANSLATOR(s):", type="a")
-    for line in author_lines:
-        debmake.debug.debug("Da: {}".format(line), type="a")
+    license_lines = clean_license(license_lines, file, utf8=decoding["utf8"])
+    if debug_a:
+        debmake.debug.debug("Da: AUTHOR(s)/TRANSLATOR(s):", type="a")
+        for line in author_lines:
+            debmake.debug.debug("Da: {}".format(line), type="a")
     return (copyright_data, license_lines)
 
 
 ###################################################################
 # Check license of a text file
 ###################################################################
-def parse_encoded_lines(file, encoding="utf-8", pedantic=False):
-    ###################################################################
-    # Start analyzing file (default encoding)
-    ###################################################################
+###################################################################
+# Read lines of a file lazily
+###################################################################
+# parse_lines() usually stops after the header comment.  Lines are read
+# block by block into a preallocated buffer (one per thread) and decoded
+# only when parse_lines() asks for them, so the rest of the file is never
+# read.  Lines are split as the text mode does (universal newlines).
+# encoding must be ASCII compatible (utf-8, latin-1, ...).
+# If a line can not be decoded, it and all following lines are decoded as
+# latin-1 without reading the file again.  Files starting with UTF-16 or
+# UTF-32 BOM are decoded as a whole.
+read_local = threading.local()
+boms = [
+    (codecs.BOM_UTF32_LE, "utf-32"),  # check before UTF-16 LE
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+
+def read_buffer():
     try:
-        with open(file, "r", encoding=encoding) as fd:
-            (copyright_data, license_lines) = parse_lines(
-                fd.readlines(), file, utf8=True, pedantic=pedantic
-            )
+        return read_local.buffer
+    except AttributeError:
+        read_local.buffer = bytearray(READ_SIZE)
+        return read_local.buffer
+
+
+def decode_error(file, e, decoding):
+    print(
+        "W: Non-UTF-8 char found, using latin-1: {}\nW: ... {}".format(file, e),
+        file=sys.stderr,
+    )
+    decoding["utf8"] = False
+    return
+
+
+def decode_line(data, file, encoding, decoding):
+    if data[-2:] == b"\r\n":
+        (data, eol) = (data[:-2], "\n")
+    elif data[-1:] in (b"\r", b"\n"):
+        (data, eol) = (data[:-1], "\n")
+    else:
+        eol = ""
+    if decoding["utf8"]:
+        try:
+            return data.decode(encoding) + eol
+        except UnicodeDecodeError as e:
+            decode_error(file, e, decoding)
+    return data.decode("latin-1") + eol
+
+
+def decode_bom(data, file, bom_encoding, decoding):
+    try:
+        text = data.decode(bom_encoding)
+    except UnicodeDecodeError as e:
+        decode_error(file, e, decoding)
+        text = data.decode("latin-1")
+    return io.StringIO(text, newline=None)
+
+
+def read_lines(file, encoding="utf-8", decoding=None, content=None):
+    # decoding["utf8"] is set to False when falling back to latin-1
+    # content: whole file content already read (bytes), file is not opened
+    if decoding is None:
+        decoding = {"utf8": True}
+    if content is not None:
+        for bom, bom_encoding in boms:
+            if content.startswith(bom):
+                yield from decode_bom(content, file, bom_encoding, decoding)
+                return
+        for data in content.splitlines(keepends=True):
+            yield decode_line(data, file, encoding, decoding)
+        return
+    buffer = read_buffer()
+    view = memoryview(buffer)
+    rest = b""
+    first = True
+    with open(file, "rb", buffering=0) as fd:
+        while True:
+            n = fd.readinto(buffer)
+            if n == 0:
+                break
+            data = rest + view[:n]
+            if first:
+                first = False
+                for bom, bom_encoding in boms:
+                    if data.startswith(bom):
+                        data += fd.readall()
+                        yield from decode_bom(data, file, bom_encoding, decoding)
+                        return
+            lines = data.splitlines(keepends=True)
+            # hold back the incomplete last line (or "\r" of "\r\n")
+            if lines[-1][-1:] == b"\n":
+                rest = b""
+            else:
+                rest = lines.pop()
+            for data in lines:
+                yield decode_line(data, file, encoding, decoding)
+    if rest:
+        yield decode_line(rest, file, encoding, decoding)
+    return
+
+
+def parse_encoded_lines(file, encoding="utf-8", pedantic=False, content=None):
     ###################################################################
-    # Fall back for analyzing file (latin-1 encoding)
+    # Start analyzing file (default encoding, fall back to latin-1)
     ###################################################################
-    except UnicodeDecodeError as e:
-        print(
-            "W: Non-UTF-8 char found, using latin-1: {}\nW: ... {}".format(file, e),
-            file=sys.stderr,
-        )
-        with open(file, "r", encoding="latin-1") as fd:
-            (copyright_data, license_lines) = parse_lines(
-                fd.readlines(), file, utf8=False, pedantic=pedantic
-            )
+    decoding = {"utf8": True}
+    (copyright_data, license_lines) = parse_lines(
+        read_lines(file, encoding=encoding, decoding=decoding, content=content),
+        file,
+        pedantic=pedantic,
+        decoding=decoding,
+    )
     return (copyright_data, license_lines)
 
 
@@ -1270,6 +1416,240 @@ re_permissive = re.compile(
 )
 
 
+###################################################################
+# Worker functions for the process pool (--jobs)
+###################################################################
+def parse_file(task):
+    # task: (file, encoding, pedantic, content, cwd)
+    # cwd: directory of the relative file; a pool worker may be forked in
+    #      another directory and kept over many scans (checkdep5_batch())
+    (file, encoding, pedantic, content, cwd) = task
+    if content is None and not os.path.isabs(file) and os.getcwd() != cwd:
+        os.chdir(cwd)
+    return parse_encoded_lines(
+        file, encoding=encoding, pedantic=pedantic, content=content
+    )
+
+
+def parse_chunk(tasks):
+    # parse a chunk of tasks of parse_file() in a pool worker
+    return [parse_file(task) for task in tasks]
+
+
+def classify_license(norm_text):
+    return debmake.lc.lc_classify(norm_text)
+
+
+def get_jobs(jobs):
+    # jobs = 0: use all CPUs
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
+    return jobs
+
+
+def get_pool(jobs, executor=None):
+    # return context manager of the process pool with jobs workers
+    # executor: process pool shared by many scans (left running on exit)
+    if executor is not None:
+        return contextlib.nullcontext(executor)
+    return concurrent.futures.ProcessPoolExecutor(max_workers=jobs)
+
+
+###################################################################
+# Parse all files (serial or over the process pool)
+###################################################################
+def parse_all_files(
+    files,
+    encoding="utf-8",
+    pedantic=False,
+    jobs=1,
+    cache=None,
+    contents=None,
+    executor=None,
+):
+    # return list of (copyright_data, license_lines) in the order of files
+    # contents: {file: bytes} of files already read by scanfiles()
+    if contents is None:
+        contents = {}
+    parsed = [None] * len(files)
+    options = "{}:{}".format(encoding, pedantic)
+    todo = []
+    for i, file in enumerate(files):
+        if cache is not None:
+            parsed[i] = debmake.cache.get_file(cache, file, options)
+        if parsed[i] is None:
+            todo.append(i)
+        else:
+            print(".", file=sys.stderr, end="", flush=True)
+    if jobs <= 1 or len(todo) <= 1:
+        for i in todo:
+            print(".", file=sys.stderr, end="", flush=True)
+            parsed[i] = parse_encoded_lines(
+                files[i],
+                encoding=encoding,
+                pedantic=pedantic,
+                content=contents.get(files[i]),
+            )
+    else:
+        # schedule large files first to avoid stragglers at the end of the run
+        todo = sorted(
+            todo,
+            key=lambda i: (
+                len(contents[files[i]])
+                if files[i] in contents
+                else os.path.getsize(files[i])
+            ),
+            reverse=True,
+        )
+        cwd = os.getcwd()
+        tasks = [
+            (files[i], encoding, pedantic, contents.get(files[i]), cwd) for i in todo
+        ]
+        chunksize = max(1, min(64, len(tasks) // (jobs * 16)))
+        with get_pool(jobs, executor) as executor:
+            for i, result in zip(
+                todo, executor.map(parse_file, tasks, chunksize=chunksize)
+            ):
+                print(".", file=sys.stderr, end="", flush=True)
+                parsed[i] = result
+    if cache is not None:
+        for i in todo:
+            (copyright_data, license_lines) = parsed[i]
+            debmake.cache.put_file(
+                cache, files[i], options, copyright_data, license_lines
+            )
+        debmake.cache.commit_cache(cache)
+    return parsed
+
+
+###################################################################
+# Parse files while they are streamed in (serial or over the process pool)
+###################################################################
+def parse_stream_files(
+    files,
+    encoding="utf-8",
+    pedantic=False,
+    jobs=1,
+    cache=None,
+    contents=None,
+    executor=None,
+):
+    # files: iterator yielding files, e.g. scanfiles.scan_tree()
+    # return (files, parsed) as lists in the order of files
+    # Each file is parsed (or sent to the pool) as soon as it is yielded
+    # so the producer of files runs concurrently with parsing.
+    if contents is None:
+        contents = {}
+    file_list = []
+    parsed = []
+    options = "{}:{}".format(encoding, pedantic)
+    todo = []
+    cwd = os.getcwd()
+
+    def tasks():
+        for file in files:
+            i = len(file_list)
+            file_list.append(file)
+            parsed.append(None)
+            if cache is not None:
+                parsed[i] = debmake.cache.get_file(cache, file, options)
+            if parsed[i] is None:
+                todo.append(i)
+                # release the content once it is handed to the parser
+                yield (file, encoding, pedantic, contents.pop(file, None), cwd)
+            else:
+                print(".", file=sys.stderr, end="", flush=True)
+        return
+
+    if jobs <= 1:
+        for task in tasks():
+            print(".", file=sys.stderr, end="", flush=True)
+            parsed[todo[-1]] = parse_file(task)
+    else:
+        with get_pool(jobs, executor) as executor:
+            # start workers before the producer may start its thread
+            executor.submit(get_jobs, jobs).result()
+            # Small files read while walking are sent in chunks.  A large file
+            # (no content) is sent on its own as soon as it is found so that
+            # it starts early instead of waiting for a chunk to fill up.
+            # At most STREAM_INFLIGHT * jobs chunks (with their contents) are
+            # in flight; the oldest is drained before more are submitted.
+            futures = collections.deque()  # [(indices in parsed, future), ...]
+
+            def drain():
+                (indices, future) = futures.popleft()
+                for i, result in zip(indices, future.result()):
+                    print(".", file=sys.stderr, end="", flush=True)
+                    parsed[i] = result
+                return
+
+            def submit(indices, chunk):
+                while len(futures) >= STREAM_INFLIGHT * jobs:
+                    drain()
+                futures.append((indices, executor.submit(parse_chunk, chunk)))
+                return
+
+            chunk = []
+            indices = []
+            for task in tasks():
+                if task[3] is None:
+                    submit([todo[-1]], [task])
+                    continue
+                chunk.append(task)
+                indices.append(todo[-1])
+                if len(chunk) >= STREAM_CHUNK_SIZE:
+                    submit(indices, chunk)
+                    chunk = []
+                    indices = []
+            if chunk:
+                submit(indices, chunk)
+            while futures:
+                drain()
+    if cache is not None:
+        for i in todo:
+            (copyright_data, license_lines) = parsed[i]
+            debmake.cache.put_file(
+                cache, file_list[i], options, copyright_data, license_lines
+            )
+        debmake.cache.commit_cache(cache)
+    return (file_list, parsed)
+
+
+###################################################################
+# Classify all unique license texts (serial or over the process pool)
+###################################################################
+def classify_all_licenses(texts, jobs=1, cache=None, debug=False, executor=None):
+    # texts: {md5hashkey: (norm_text, license_lines)}
+    # return: {md5hashkey: data of debmake.lc.lc_classify()}
+    # classification is mode independent and shared via the scan cache
+    # except for the debug modes which need match_text and norm_text
+    if debug:
+        cache = None
+    if debmake.lc.profile_enabled():
+        # count every rule search in this process
+        cache = None
+        jobs = 1
+    classified = {}
+    keys = []
+    for k in texts.keys():
+        if cache is not None:
+            classified[k] = debmake.cache.get_license(cache, k)
+        if classified.get(k) is None:
+            keys.append(k)
+    tasks = [texts[k][0] for k in keys]
+    if jobs <= 1 or len(tasks) <= 1:
+        results = map(classify_license, tasks)
+        classified.update(zip(keys, results))
+    else:
+        with get_pool(jobs, executor) as executor:
+            classified.update(zip(keys, executor.map(classify_license, tasks)))
+    if cache is not None:
+        for k in keys:
+            debmake.cache.put_license(cache, k, classified[k])
+        debmake.cache.commit_cache(cache)
+    return classified
+
+
 ###################################################################
 # Check all appearing copyright and license texts in files
 ###################################################################
@@ -1278,125 +1658,317 @@ re_permissive = re.compile(
 # data[*][2]: copyright holder info (data=dictionary): copyright_lines
 # data[*][3]: license text (original: list of lines): license_lines
 ###################################################################
-def check_all_licenses(files, encoding="utf-8", mode=0, pedantic=False):
+# fake differences of hash for no license cases
+# without copyright qnd without license
+md5hashkey0 = hashlib.md5("__NO_COPYRIGHT_NOR_LICENSE__".encode()).hexdigest()
+# with copyright but without license
+md5hashkey1 = hashlib.md5("__NO_LICENSE__".encode()).hexdigest()
+# Auto-generated file under the permissive license
+md5hashkey2 = hashlib.md5("__AUTO_PERMISSIVE__".encode()).hexdigest()
+
+
+def license_key(file, copyright_data, license_lines):
+    # return (md5hashkey, copyright_data, norm_text) for the parse result of
+    # file where norm_text is None if there is no license text to classify
+    if copyright_data == {} and license_lines == []:
+        # without copyright and without license
+        return (md5hashkey0, {"__NO_COPYRIGHT_NOR_LICENSE__": (9999, 0)}, None)
+    elif license_lines == []:
+        # with copyright but without license
+        return (md5hashkey1, copyright_data, None)
+    norm_text = debmake.lc.normalize(license_lines)
+    md5hash = hashlib.md5()
+    md5hash.update(norm_text.encode())
+    if copyright_data == {}:
+        copyright_data = {"__NO_COPYRIGHT__ in: {}".format(file): (9999, 0)}
+    # else: copyright_data is already set by parse_encoded_lines
+    return (md5hash.hexdigest(), copyright_data, norm_text)
+
+
+###################################################################
+# Scan files into the mode independent sdata
+###################################################################
+# sdata["files"]:    [(file, md5hashkey, copyright_data), ...]
+# sdata["licenses"]: {md5hashkey: (data, norm_text, license_lines)}
+#                    with data of debmake.lc.lc_classify()
+# sdata["count"]:    number of files given
+# sdata["debug"]:    data keeps match_text and norm_text
+# sdata is rendered into adata by license_all_files() for any mode and
+# saved or loaded by debmake.snapshot
+###################################################################
+def scan_all_licenses(
+    files,
+    encoding="utf-8",
+    pedantic=False,
+    jobs=1,
+    cache=None,
+    contents=None,
+    debug=False,
+    known=None,
+    executor=None,
+):
+    # known: {md5hashkey: ...} of license texts already classified which are
+    #        left out of sdata["licenses"]
+    # executor: process pool shared by many scans (see get_pool())
+    debug_f = debmake.debug.enabled("f")
+    debug_l = debmake.debug.enabled("l")
+    # files: list of files or iterator streaming them (scanfiles.scan_tree())
+    # contents: {file: bytes} of files already read by scanfiles()
+    if contents is None:
+        contents = {}
+    streamed = not isinstance(files, list)
+    if not streamed and len(files) == 0:
+        print("W: check_all_licenses(files) should have files", file=sys.stderr)
+    jobs = get_jobs(jobs)
+    all_files = []
+
+    def existing_files():
+        for file in files:
+            all_files.append(file)
+            if debug_f:
+                debmake.debug.debug(
+                    "Df: check_all_licenses file={}".format(file), type="f"
+                )
+            if file in contents or os.path.isfile(file):
+                yield file  # file in contents may be a tarball member
+            elif os.path.isdir(file):
+                print(
+                    "W: skip check_all_licenses on directory: {}".format(file),
+                    file=sys.stderr,
+                )
+            else:
+                print(
+                    "W: skip check_all_licenses on non-existing file: {}".format(file),
+                    file=sys.stderr,
+                )
+        return
+
+    if not streamed:
+        text_files = list(existing_files())
+    if jobs > 1:
+        print("I: check_all_licenses with {} jobs".format(jobs), file=sys.stderr)
+    print("I: ", file=sys.stderr, end="", flush=True)
+    with debmake.timing.phase("parse"):
+        if streamed:
+            (text_files, parsed) = parse_stream_files(
+                existing_files(),
+                encoding=encoding,
+                pedantic=pedantic,
+                jobs=jobs,
+                cache=cache,
+                contents=contents,
+                executor=executor,
+            )
+        else:
+            parsed = parse_all_files(
+                text_files,
+                encoding=encoding,
+                pedantic=pedantic,
+                jobs=jobs,
+                cache=cache,
+                contents=contents,
+                executor=executor,
+            )
+    if streamed and len(all_files) == 0:
+        print("W: check_all_licenses(files) should have files", file=sys.stderr)
+    # normalize license texts and pick unique ones to be classified
+    fdata = []
+    texts = {}
+    for file, (copyright_data, license_lines) in zip(text_files, parsed):
+        (md5hashkey, copyright_data, norm_text) = license_key(
+            file, copyright_data, license_lines
+        )
+        if norm_text is not None:
+            if md5hashkey not in texts and not (known and md5hashkey in known):
+                texts[md5hashkey] = (norm_text, license_lines)
+        fdata.append((file, md5hashkey, copyright_data))
+        if debug_l:
+            for ll in license_lines:
+                debmake.debug.debug("Dl: {}".format(ll), type="l")
+    with debmake.timing.phase("classify"):
+        classified = classify_all_licenses(
+            texts, jobs=jobs, cache=cache, debug=debug, executor=executor
+        )
+    print(
+        "\nI: check_all_licenses completed for {} files.".format(len(all_files)),
+        file=sys.stderr,
+    )
+    return {
+        "files": fdata,
+        "licenses": {
+            k: (classified[k], norm_text, license_lines)
+            for k, (norm_text, license_lines) in texts.items()
+        },
+        "count": len(all_files),
+        "debug": debug,
+    }
+
+
+###################################################################
+# Render sdata of scan_all_licenses() into adata for mode
+###################################################################
+def license_all_files(sdata, mode=0, pedantic=False):
     adata = []
+    debug_c = debmake.debug.enabled("c")
+    debug_f = debmake.debug.enabled("f")
+    debug_l = debmake.debug.enabled("l")
     license_cache = {}  # (licenseid, licensetext) = license_cache[md5hashkey]
-    # fake differences of hash for no license cases
-    # without copyright qnd without license
-    md5hash = hashlib.md5()
-    md5hash.update("__NO_COPYRIGHT_NOR_LICENSE__".encode())
-    md5hashkey0 = md5hash.hexdigest()
     license_cache[md5hashkey0] = ("__NO_COPYRIGHT_NOR_LICENSE__", "")
-    # with copyright but without license
-    md5hash = hashlib.md5()
-    md5hash.update("__NO_LICENSE__".encode())
-    md5hashkey1 = md5hash.hexdigest()
     license_cache[md5hashkey1] = ("__NO_LICENSE__", "")
-    # Auto-generated file under the permissive license
-    md5hash = hashlib.md5()
-    md5hash.update("__AUTO_PERMISSIVE__".encode())
-    md5hashkey2 = md5hash.hexdigest()
     license_cache[md5hashkey2] = (
         "__AUTO_PERMISSIVE__",
         "\n Autogenerated files with permissive licenses.",
     )
-    if len(files) == 0:
-        print("W: check_all_licenses(files) should have files", file=sys.stderr)
-    print("I: ", file=sys.stderr, end="", flush=True)
-    for file in files:
-        debmake.debug.debug("Df: check_all_licenses file={}".format(file), type="f")
-        if os.path.isfile(file):
-            print(".", file=sys.stderr, end="", flush=True)
-            (copyright_data, license_lines) = parse_encoded_lines(
-                file, encoding=encoding, pedantic=pedantic
-            )
-            if copyright_data == {} and license_lines == []:
-                # without copyright and without license
-                norm_text = ""
-                md5hashkey = md5hashkey0
-                copyright_data = {"__NO_COPYRIGHT_NOR_LICENSE__": (9999, 0)}
-            elif license_lines == []:
-                # with copyright but without license
-                norm_text = ""
-                md5hashkey = md5hashkey1
-            elif copyright_data == {}:
-                norm_text = debmake.lc.normalize(license_lines)
-                md5hash = hashlib.md5()
-                md5hash.update(norm_text.encode())
-                md5hashkey = md5hash.hexdigest()
-                copyright_data = {"__NO_COPYRIGHT__ in: {}".format(file): (9999, 0)}
-            else:
-                norm_text = debmake.lc.normalize(license_lines)
-                md5hash = hashlib.md5()
-                md5hash.update(norm_text.encode())
-                md5hashkey = md5hash.hexdigest()
-                # copyright_data is already set by parse_encoded_lines
-            if md5hashkey in license_cache.keys():
-                (licenseid, licensetext) = license_cache[md5hashkey]
-            else:
-                (licenseid, licensetext) = debmake.lc.lc(norm_text, license_lines, mode)
-                license_cache[md5hashkey] = (licenseid, licensetext)
-            # clean up output bundling as __AUTO_PERMISSIVE__
+    for k, (data, norm_text, license_lines) in sdata["licenses"].items():
+        if abs(mode) >= 4 and not sdata["debug"]:
+            # match_text and norm_text are needed for the debug modes
+            data = classify_license(norm_text)
+        license_cache[k] = debmake.lc.lc_format(data, license_lines, mode)
+    for file, md5hashkey, copyright_data in sdata["files"]:
+        (licenseid, licensetext) = license_cache[md5hashkey]
+        # clean up output bundling as __AUTO_PERMISSIVE__
+        if debug_l:
             debmake.debug.debug("Dl: LICENSE_ID orig= {}".format(licenseid), type="l")
-            if (
-                not pedantic
-                and re_permissive.search(licenseid)
-                and re_autofiles.search(file)
-            ):
-                md5hashkey = md5hashkey2
-                (licenseid, licensetext) = license_cache[md5hashkey]
-            elif pedantic:
+        if not pedantic and re_permissive.search(licenseid) and re_autofiles.search(file):
+            md5hashkey = md5hashkey2
+            (licenseid, licensetext) = license_cache[md5hashkey]
+        elif pedantic:
+            if debug_f:
                 debmake.debug.debug(
                     "Df: {} is treated as {} since pedantic".format(file, licenseid),
                     type="f",
                 )
-            elif re_permissive.search(licenseid):
+        elif re_permissive.search(licenseid):
+            if debug_f:
                 debmake.debug.debug(
                     "Df: {} skipped since not-pedantic and matching re_autofiles".format(
                         file
                     ),
                     type="f",
                 )
-            elif re_autofiles.search(file):
+        elif re_autofiles.search(file):
+            if debug_f:
                 debmake.debug.debug(
                     "Df: {} skipped since not-pedantic and matching re_permissive".format(
                         file
                     ),
                     type="f",
                 )
-            else:
+        else:
+            if debug_f:
                 debmake.debug.debug(
                     "Df: {} logically this should not happen for __AUTO_PERMISSIVE__ code: {}".format(
                         file, md5hashkey
                     ),
                     type="f",
                 )
+        if debug_l:
             debmake.debug.debug("Dl: LICENSE_ID = {}".format(licenseid), type="l")
-            adata.append((md5hashkey, copyright_data, licenseid, licensetext, file))
-            for c in copyright_data.keys():
+        adata.append((md5hashkey, copyright_data, licenseid, licensetext, file))
+        for c in copyright_data.keys():
+            if debug_c:
                 debmake.debug.debug(
-                    "Dc: {}-{}: {}".format(
-                        copyright_data[c][0], copyright_data[c][1], c
-                    ),
+                    "Dc: {}-{}: {}".format(copyright_data[c][0], copyright_data[c][1], c),
                     type="c",
                 )
-            for ll in license_lines:
-                debmake.debug.debug("Dl: {}".format(ll), type="l")
-        elif os.path.isdir(file):
-            print(
-                "W: skip check_all_licenses on directory: {}".format(file),
-                file=sys.stderr,
-            )
-        else:
+    return adata
+
+
+def check_all_licenses(
+    files, encoding="utf-8", mode=0, pedantic=False, jobs=1, cache=None, contents=None
+):
+    sdata = scan_all_licenses(
+        files,
+        encoding=encoding,
+        pedantic=pedantic,
+        jobs=jobs,
+        cache=cache,
+        contents=contents,
+        debug=abs(mode) >= 4,
+    )
+    return license_all_files(sdata, mode=mode, pedantic=pedantic)
+
+
+###################################################################
+# Stream adata of files one by one (serial)
+###################################################################
+def iter_all_licenses(files, encoding="utf-8", mode=0, pedantic=False):
+    # yield adata items of check_all_licenses() as soon as each file is done
+    licenses = {}  # {md5hashkey: (data, norm_text, license_lines)}
+    for file in files:
+        if not os.path.isfile(file):
             print(
-                "W: skip check_all_licenses on non-existing file: {}".format(file),
+                "W: skip check_all_licenses on non-file: {}".format(file),
                 file=sys.stderr,
             )
-    print(
-        "\nI: check_all_licenses completed for {} files.".format(len(files)),
-        file=sys.stderr,
+            continue
+        (copyright_data, license_lines) = parse_encoded_lines(
+            file, encoding=encoding, pedantic=pedantic
+        )
+        (md5hashkey, copyright_data, norm_text) = license_key(
+            file, copyright_data, license_lines
+        )
+        if norm_text is not None and md5hashkey not in licenses:
+            data = classify_license(norm_text)
+            licenses[md5hashkey] = (data, norm_text, license_lines)
+        sdata = {
+            "files": [(file, md5hashkey, copyright_data)],
+            "licenses": {},
+            "debug": True,
+        }
+        if md5hashkey in licenses:
+            sdata["licenses"][md5hashkey] = licenses[md5hashkey]
+        yield from license_all_files(sdata, mode=mode, pedantic=pedantic)
+    return
+
+
+###################################################################
+# Bunch adata of files sharing the same license (same md5hashkey)
+###################################################################
+md5hashkey3 = hashlib.md5("__UNSET__".encode()).hexdigest()
+
+
+def bunch_license(data_by_license):
+    # data_by_license: non-empty list of adata items with the same md5hashkey
+    # return: bdata item
+    bunched_files = []
+    licenseid = ""
+    licensetext = ""
+    md5hashkey = md5hashkey3
+    bunched_copyright_data = {}
+    if len(data_by_license) == 0:
+        raise ValueError("data_by_license list should not be []")
+    for (
+        md5hashkey,
+        copyright_data,
+        licenseid,
+        licensetext,
+        file,
+    ) in data_by_license:
+        bunched_files.append(file)
+        for name, (year_min, year_max) in copyright_data.items():
+            if name in bunched_copyright_data.keys():
+                (year_min0, year_max0) = bunched_copyright_data[name]
+                bunched_copyright_data[name] = (
+                    min(year_min0, year_min),
+                    max(year_max0, year_max),
+                )
+            else:
+                bunched_copyright_data[name] = (year_min, year_max)
+    sortkey = "{0:03} {1:02} {2} {3}".format(
+        max(0, 1000 - len(bunched_files)),
+        min(99, len(licenseid)),
+        licenseid,
+        md5hashkey,
     )
-    return adata
+    bunched_files = sorted(bunched_files)
+    copyright_list = []
+    for name, (year_min, year_max) in sorted(bunched_copyright_data.items()):
+        copyright_list.append((year_min, year_max, name))
+    debmake.debug.debug(
+        'Dk: sortkey="{}", files={}'.format(sortkey, bunched_files), type="k"
+    )
+    return (sortkey, bunched_files, sorted(copyright_list), licenseid, licensetext)
 
 
 def bunch_all_licenses(adata):
@@ -1411,51 +1983,8 @@ def bunch_all_licenses(adata):
         print("W: group_by_license list should not be []", file=sys.stderr)
     # bunch the same license for reporting
     bdata = []
-    md5hash = hashlib.md5()
-    md5hash.update("__UNSET__".encode())
-    md5hashkey3 = md5hash.hexdigest()
     for data_by_license in group_by_license:
-        bunched_files = []
-        licenseid = ""
-        licensetext = ""
-        md5hashkey = md5hashkey3
-        bunched_copyright_data = {}
-        if len(data_by_license) == 0:
-            print("E: data_by_license list should not be []", file=sys.stderr)
-            exit(1)
-        for (
-            md5hashkey,
-            copyright_data,
-            licenseid,
-            licensetext,
-            file,
-        ) in data_by_license:
-            bunched_files.append(file)
-            for name, (year_min, year_max) in copyright_data.items():
-                if name in bunched_copyright_data.keys():
-                    (year_min0, year_max0) = bunched_copyright_data[name]
-                    bunched_copyright_data[name] = (
-                        min(year_min0, year_min),
-                        max(year_max0, year_max),
-                    )
-                else:
-                    bunched_copyright_data[name] = (year_min, year_max)
-        sortkey = "{0:03} {1:02} {2} {3}".format(
-            max(0, 1000 - len(bunched_files)),
-            min(99, len(licenseid)),
-            licenseid,
-            md5hashkey,
-        )
-        bunched_files = sorted(bunched_files)
-        copyright_list = []
-        for name, (year_min, year_max) in sorted(bunched_copyright_data.items()):
-            copyright_list.append((year_min, year_max, name))
-        bdata.append(
-            (sortkey, bunched_files, sorted(copyright_list), licenseid, licensetext)
-        )
-        debmake.debug.debug(
-            'Dk: sortkey="{}", files={}'.format(sortkey, bunched_files), type="k"
-        )
+        bdata.append(bunch_license(data_by_license))
     return bdata
 
 
@@ -1497,22 +2026,339 @@ def format_all_licenses(bdata):
     return cdata
 
 
-def checkdep5(files, mode=0, encoding="utf-8", pedantic=False):
+def checkdep5_scan(
+    files,
+    mode=0,
+    encoding="utf-8",
+    pedantic=False,
+    jobs=1,
+    cache=False,
+    verify=False,
+    contents=None,
+):
+    # return sdata of scan_all_licenses() for files (see checkdep5())
+    if cache:
+        cache = debmake.cache.open_cache(verify=verify)
+    else:
+        cache = None
     print("I: check_all_licenses", file=sys.stderr)
-    adata = check_all_licenses(files, encoding=encoding, mode=mode, pedantic=pedantic)
+    with debmake.timing.phase("scan"):
+        sdata = scan_all_licenses(
+            files,
+            encoding=encoding,
+            pedantic=pedantic,
+            jobs=jobs,
+            cache=cache,
+            contents=contents,
+            debug=abs(mode) >= 4,
+        )
+    debmake.cache.close_cache(cache)
+    return sdata
+
+
+def checkdep5(
+    files,
+    mode=0,
+    encoding="utf-8",
+    pedantic=False,
+    jobs=1,
+    cache=False,
+    verify=False,
+    contents=None,
+    sdata=None,
+):
+    # cache:    use the persistent scan cache
+    # verify:   check the content digest of cached files, too
+    # contents: {file: bytes} of small files already read by scanfiles()
+    # sdata:    render this result of scan_all_licenses() instead of files
+    # files may be an iterator such as scanfiles.scan_tree() to parse files
+    # while the tree is walked
+    if sdata is None:
+        sdata = checkdep5_scan(
+            files,
+            mode=mode,
+            encoding=encoding,
+            pedantic=pedantic,
+            jobs=jobs,
+            cache=cache,
+            verify=verify,
+            contents=contents,
+        )
+    with debmake.timing.phase("render"):
+        adata = license_all_files(sdata, mode=mode, pedantic=pedantic)
     print("I: bunch_all_licenses", file=sys.stderr)
-    bdata = bunch_all_licenses(adata)
+    with debmake.timing.phase("bunch"):
+        bdata = bunch_all_licenses(adata)
     print("I: format_all_licenses", file=sys.stderr)
-    cdata = format_all_licenses(bdata)
+    with debmake.timing.phase("format"):
+        cdata = format_all_licenses(bdata)
     return cdata
 
 
+###################################################################
+# Scan the source tree and its licenses in one streaming pass
+###################################################################
+def checkdep5_tree(
+    mode=0,
+    pedantic=False,
+    jobs=1,
+    cache=False,
+    verify=False,
+    tarball="",
+    entries=None,
+    save="",
+    load="",
+):
+    # return (cdata, scanned) with scanned as returned by scanfiles.scanfiles()
+    # text files are parsed while the walker thread is still walking the tree
+    # tarball: scan its members in place instead of the tree under "."
+    # entries: list to be extended with all entries of the tree walked as
+    #          (path, is_dir, is_file) for matching debian/copyright patterns
+    # save:    save the scan result to this snapshot file
+    # load:    render from this snapshot file without touching the tree
+    if load:
+        (sdata, scan, walked) = debmake.snapshot.load_scan(load, pedantic=pedantic)
+        if entries is not None:
+            if not walked:
+                print(
+                    "W: scan snapshot has no tree entries: {}".format(load),
+                    file=sys.stderr,
+                )
+            entries.extend(walked)
+    else:
+        contents = {}  # small files read once while walking
+        if tarball:
+            cache = False  # the cache is keyed by files on the disk
+        if save and entries is None:
+            entries = []  # record the tree for debmake -k from the snapshot
+        scan = debmake.scanfiles.new_scan()
+        sdata = checkdep5_scan(
+            debmake.scanfiles.scan_tree(
+                scan, contents=contents, tarball=tarball, entries=entries
+            ),
+            mode=mode,
+            pedantic=pedantic,
+            jobs=jobs,
+            cache=cache,
+            verify=verify,
+            contents=contents,
+        )
+        walked = entries or []
+    if save:
+        debmake.snapshot.save_scan(
+            save, sdata, scan, walked, pedantic=pedantic, tarball=tarball
+        )
+    cdata = checkdep5(None, mode=mode, pedantic=pedantic, sdata=sdata)
+    return (cdata, debmake.scanfiles.scan_report(scan))
+
+
+###################################################################
+# JSON records (--format=jsonl, --batch)
+###################################################################
+def copyright_record(copyright_list):
+    # copyright_list: [(year_min, year_max, name), ...]
+    # years is None if not found
+    return [
+        {"name": name, "years": [year_min, year_max] if year_max else None}
+        for year_min, year_max, name in copyright_list
+    ]
+
+
+def adata_record(item):
+    (md5hashkey, copyright_data, licenseid, licensetext, file) = item
+    copyright_list = []
+    for name, (year_min, year_max) in sorted(copyright_data.items()):
+        copyright_list.append((year_min, year_max, name))
+    return {
+        "file": file,
+        "md5": md5hashkey,
+        "license": licenseid,
+        "text": licensetext,
+        "copyright": copyright_record(sorted(copyright_list)),
+    }
+
+
+def bdata_record(item):
+    (sortkey, bunched_files, copyright_list, licenseid, licensetext) = item
+    return {
+        "files": bunched_files,
+        "md5": sortkey.rsplit(" ", 1)[1],  # sortkey ends with md5hashkey
+        "license": licenseid,
+        "text": licensetext,
+        "copyright": copyright_record(copyright_list),
+    }
+
+
+def print_record(record):
+    print(json.dumps(record), flush=True)
+    return
+
+
+###################################################################
+# Scan many source trees or tarballs in one process (--batch)
+###################################################################
+def batch_source(source, mode, pedantic, jobs, cache, executor, known):
+    # return JSON record of the scan of source (tree or tarball)
+    # known: {md5hashkey: ...} of classified licenses shared by all sources
+    scan = debmake.scanfiles.new_scan()
+    contents = {}  # small files read once while walking
+    if os.path.isdir(source):
+        os.chdir(source)
+        files = debmake.scanfiles.scan_tree(scan, contents=contents)
+    elif os.path.isfile(source):
+        cache = None  # the cache is keyed by files on the disk
+        files = debmake.scanfiles.scan_tree(scan, contents=contents, tarball=source)
+    else:
+        raise FileNotFoundError("non-existing source: {}".format(source))
+    sdata = scan_all_licenses(
+        files,
+        pedantic=pedantic,
+        jobs=jobs,
+        cache=cache,
+        contents=contents,
+        known=known,
+        executor=executor,
+    )
+    known.update(sdata["licenses"])
+    sdata["licenses"] = {
+        md5hashkey: known[md5hashkey]
+        for _, md5hashkey, _ in sdata["files"]
+        if md5hashkey in known
+    }
+    bdata = bunch_all_licenses(license_all_files(sdata, mode=mode, pedantic=pedantic))
+    (_, xml_html_files, binary_files, huge_files, _, count_list) = (
+        debmake.scanfiles.scan_report(scan)
+    )
+    return {
+        "source": source,
+        "files": sdata["count"],
+        "licenses": [
+            bdata_record(item) for item in sorted(bdata, key=operator.itemgetter(0))
+        ],
+        "xml_html_files": xml_html_files,
+        "binary_files": binary_files,
+        "huge_files": huge_files,
+        "extensions": dict(count_list),
+    }
+
+
+def checkdep5_batch(listfile, mode=1, pedantic=False, jobs=1, cache=True):
+    # listfile: source trees or tarballs, one per line ("-" for stdin)
+    # print one JSON record per source; a failed source is reported in its
+    # record as "error" and the batch goes on with the next one.
+    if listfile == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(listfile, mode="r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    sources = [line.strip() for line in lines if line.strip()[:1] not in ("", "#")]
+    jobs = get_jobs(jobs)
+    if cache:
+        cache = debmake.cache.open_cache()
+    else:
+        cache = None
+    known = {}
+    executor = None
+    cwd = os.getcwd()
+    failed = 0
+    try:
+        for source in sources:
+            print("I: batch scan {}".format(source), file=sys.stderr)
+            if jobs > 1 and executor is None:
+                # one process pool for all sources (workers inherit lc.py rules)
+                executor = concurrent.futures.ProcessPoolExecutor(max_workers=jobs)
+            start = time.monotonic()
+            try:
+                record = batch_source(
+                    source, mode, pedantic, jobs, cache, executor, known
+                )
+            except Exception as e:  # report and go on with the next source
+                record = {
+                    "source": source,
+                    "error": "{}: {}".format(type(e).__name__, e),
+                }
+                if isinstance(e, concurrent.futures.BrokenExecutor):
+                    executor.shutdown(cancel_futures=True)
+                    executor = None  # start a new one for the next source
+            finally:
+                os.chdir(cwd)
+            if "error" in record:
+                failed += 1
+                print("E: {}".format(record["error"]), file=sys.stderr)
+            record["seconds"] = round(time.monotonic() - start, 3)
+            print_record(record)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        debmake.cache.close_cache(cache)
+    print(
+        "I: batch scan completed for {} sources ({} failed).".format(
+            len(sources), failed
+        ),
+        file=sys.stderr,
+    )
+    return failed
+
+
+def checkdep5_verify_order(files, file=""):
+    # verify the order of license rules by the hits in the profile file (or
+    # trying later rules first if file is "") against the source order on
+    # the license texts found in files
+    # return the number of license texts classified differently
+    sdata = scan_all_licenses(files)
+    texts = [norm_text for (data, norm_text, lines) in sdata["licenses"].values()]
+    if file:
+        hits = debmake.lc.load_hits(file)
+    else:
+        hits = None
+    return debmake.lc.verify_order(texts, hits)
+
+
 def checkdep5_main():
     utf8 = True
     pedantic = False
     file = ""
     files = []
     # parse command line
+    output_format = "text"
+    while len(sys.argv) > 1 and sys.argv[1].split("=")[0] in ("--format", "--profile"):
+        (option, eq, value) = sys.argv.pop(1).partition("=")
+        if option == "--format":
+            # --format=jsonl: one JSON record per line for -a, -b and dep5 mode
+            if not eq or value not in ("text", "jsonl"):
+                print(
+                    "E: --format needs =text or =jsonl: {}".format(option + eq + value),
+                    file=sys.stderr,
+                )
+                exit(1)
+            output_format = value
+        elif option == "--profile":
+            # --profile[=file]: report per-rule counters of debmake.lc at exit
+            debmake.lc.profile_enable(value)
+    if len(sys.argv) > 1 and sys.argv[1] == "--batch":
+        p = argparse.ArgumentParser(
+            prog="{} --batch".format(os.path.basename(sys.argv[0])),
+            description="scan each source tree or tarball listed in listfile",
+        )
+        p.add_argument("listfile", help='sources, one per line ("-" for stdin)')
+        p.add_argument(
+            "-J", "--jobs", type=int, default=1, help="number of parallel jobs"
+        )
+        p.add_argument(
+            "--no-cache", action="store_true", help="do not use the scan cache"
+        )
+        args = p.parse_args(sys.argv[2:])
+        if checkdep5_batch(args.listfile, jobs=args.jobs, cache=not args.no_cache):
+            exit(1)
+        return
+    if len(sys.argv) > 1 and sys.argv[1].split("=")[0] == "--verify-order":
+        # --verify-order[=file] <files ...>: check a rule order on the files
+        if len(sys.argv) < 3:
+            print("E: --verify-order needs files", file=sys.stderr)
+            exit(1)
+        if checkdep5_verify_order(sys.argv[2:], sys.argv[1].partition("=")[2]):
+            exit(1)
+        return
     if sys.argv[1] == "-s":
         mode = "selftest"
     elif sys.argv[1] == "-c":
@@ -1539,6 +2385,9 @@ def checkdep5_main():
             files = sys.argv[2:]
         else:
             files = sys.argv[1:]
+    if output_format == "jsonl" and mode not in ("adata", "bdata", "dep5"):
+        print("E: --format=jsonl is only for -a, -b and dep5 mode", file=sys.stderr)
+        exit(1)
     # main routine
     if mode == "selftest":
         print("self-test: checkdep5.py parselines()")
@@ -1592,6 +2441,18 @@ def checkdep5_main():
                 norm_text = debmake.lc.normalize(license_lines)
                 (licenseid, _) = debmake.lc.lc(norm_text, license_lines, -2)
                 print("{}\t{}".format(file, licenseid))
+        elif output_format == "jsonl":
+            if mode == "adata":
+                # one record per file as soon as it is scanned
+                for item in iter_all_licenses(files, mode=-2):
+                    print_record(adata_record(item))
+            else:
+                bdata = bunch_all_licenses(check_all_licenses(files, mode=-2))
+                if mode == "dep5":
+                    # one record per stanza in the order of debian/copyright
+                    bdata = sorted(bdata, key=operator.itemgetter(0))
+                for item in bdata:
+                    print_record(bdata_record(item))
         elif mode == "adata":
             # get adata = check_all_licenses(files, encoding=encoding, mode=mode, pedantic=pedantic)
             for (
@@ -24,13 +24,13 @@ SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 """
 
 import os
-import subprocess
 import sys
 import debmake.cat
 import debmake.control
 import debmake.copyright
 import debmake.sed
 import debmake.read
+import debmake.timing
 
 
 #######################################################################
@@ -360,7 +360,7 @@ def debian(para):
     ###################################################################
     command = "wrap-and-sort -vast"
     print("I: $ {}".format(command), file=sys.stderr)
-    if subprocess.call(command, shell=True) != 0:
+    if debmake.timing.call(command, shell=True) != 0:
         print("E: failed to run \"wrap-and-sort -vast\".", file=sys.stderr)
         exit(1)
     print(
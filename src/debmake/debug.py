@@ -29,6 +29,9 @@ import sys
 #######################################################################
 # Debug output
 #######################################################################
+# $DEBUG is read only once.  In hot loops, check enabled(type) once before
+# the loop or pass msg as a callable so that the message is not built
+# when the type is disabled.
 def get_debug():
     try:
         e = os.environ["DEBUG"]
@@ -37,15 +40,23 @@ def get_debug():
     return e
 
 
+debug_types = get_debug()
+
+
+def enabled(type=""):
+    return (debug_types != "" and type == "") or (type in debug_types)
+
+
 def debug(msg, type=""):
-    e = get_debug()
-    if (e != "" and type == "") or (type in e):
+    if enabled(type):
+        if callable(msg):
+            msg = msg()
         print(msg, file=sys.stderr)
     return
 
 
 def debug_para(msg, para):
-    e = get_debug()
+    e = debug_types
     if "p" in e:
         line = "{}:\n".format(msg)
         for x in para.keys():
@@ -62,7 +73,7 @@ def debug_para(msg, para):
 
 
 def debug_debs(msg, debs):
-    e = get_debug()
+    e = debug_types
     if "d" in e:
         line = "{}: \n".format(msg)
         for deb in debs:
@@ -81,6 +92,7 @@ def debug_debs(msg, debs):
 #######################################################################
 if __name__ == "__main__":
     debug("DEBUG ON!")
+    debug(lambda: "DEBUG {} ON!".format("lazy"), type="t")
     para = {}
     para["package"] = "package"
     para["version"] = "1.0"
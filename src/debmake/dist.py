@@ -25,8 +25,9 @@ SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 import glob
 import os
 import re
-import subprocess
 import sys
+import debmake.stage
+import debmake.timing
 
 
 ###########################################################################
@@ -40,7 +41,7 @@ def dist(para):
     if os.path.isfile("configure.ac") and os.path.isfile("Makefile.am"):
         command = 'autoreconf -ivf && ./configure --prefix "/usr" && make distcheck'
         print("I: $ {}".format(command), file=sys.stderr)
-        if subprocess.call(command, shell=True) != 0:
+        if debmake.timing.call(command, shell=True) != 0:
             print("E: autotools failed.", file=sys.stderr)
             exit(1)
         distdir = "."
@@ -93,7 +94,7 @@ def dist(para):
             "perl Build.PL && ./Build distcheck && ./Build disttest && ./Build dist"
         )
         print("I: $ {}".format(command), file=sys.stderr)
-        if subprocess.call(command, shell=True) != 0:
+        if debmake.timing.call(command, shell=True) != 0:
             print("E: perl Build.PL failed.", file=sys.stderr)
             exit(1)
         distdir = "."
@@ -104,7 +105,7 @@ def dist(para):
         # perl Makefile.PL
         command = "perl Makefile.PL && make dist"
         print("I: $ {}".format(command), file=sys.stderr)
-        if subprocess.call(command, shell=True) != 0:
+        if debmake.timing.call(command, shell=True) != 0:
             print("E: perl Makefile.PL failed.", file=sys.stderr)
             exit(1)
         distdir = "."
@@ -126,7 +127,13 @@ def dist(para):
     somepackage1 = distdir + "/*.tar.xz"
     somepackage2 = distdir + "/*.tar.gz"
     somepackage3 = distdir + "/*.tar.bz2"
-    files = glob.glob(somepackage1) + glob.glob(somepackage2) + glob.glob(somepackage3)
+    somepackage4 = distdir + "/*.tar.zst"
+    files = (
+        glob.glob(somepackage1)
+        + glob.glob(somepackage2)
+        + glob.glob(somepackage3)
+        + glob.glob(somepackage4)
+    )
     if files:
         for file in files:
             print("I: -> {} created".format(file), file=sys.stderr)
@@ -177,7 +184,10 @@ def dist(para):
                 file=sys.stderr,
             )
     else:
-        print("E: {}/*.tar.*z can not be found.".format(distdir), file=sys.stderr)
+        print(
+            "E: {}/*.tar.*z nor *.tar.zst can not be found.".format(distdir),
+            file=sys.stderr,
+        )
         print("E: not even likely tarball found", file=sys.stderr)
         exit(1)
     #######################################################################
@@ -187,19 +197,12 @@ def dist(para):
     os.chdir("..")
     print('I: pwd = "{}"'.format(os.getcwd()), file=sys.stderr)
     # cp -f parent/dist/foo-1.0.tar.gz foo-1.0.tar.gz
-    command = (
-        "cp -f "
-        + para["parent"]
-        + "/"
-        + distdir
-        + "/"
-        + para["tarball"]
-        + " "
-        + para["tarball"]
-    )
-    print("I: $ {}".format(command), file=sys.stderr)
-    if subprocess.call(command, shell=True) != 0:
-        print("E: failed to copy", file=sys.stderr)
+    try:
+        debmake.stage.stage(
+            os.path.join(para["parent"], distdir, para["tarball"]), para["tarball"]
+        )
+    except OSError as e:
+        print("E: failed to copy: {}".format(e), file=sys.stderr)
         exit(1)
     para["srcdir"] = para["package"] + "-" + para["version"]
     if para["srcdir"] == para["parent"]:
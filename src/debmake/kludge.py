@@ -23,7 +23,7 @@ TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 """
 import collections
-import glob
+import fnmatch
 import itertools
 import operator
 import os
@@ -31,18 +31,104 @@ import re
 import sys
 import debmake.debug
 import debmake.checkdep5
-import debmake.scanfiles
 
 re_round0 = re.compile(r"\.0")
+re_magic = re.compile(r"[*?[]")  # as glob.has_magic()
 
 
-def copydiff(mode, pedantic):
+###########################################################################
+# Match debian/copyright patterns against the scanned tree
+###########################################################################
+# The matcher follows glob.glob(ptn) followed by os.walk() for each
+# matched directory, evaluated against the entries recorded by a single
+# walk instead of the filesystem.
+#
+# tree: {dirpath: [(name, is_dir, is_file), ...]} in the scandir order
+def path_tree(entries):
+    tree = collections.defaultdict(list)
+    for path, is_dir, is_file in entries:
+        (dir, name) = os.path.split(path)
+        tree[dir].append((name, is_dir, is_file))
+    return tree
+
+
+def compile_pattern(ptn):
+    # return [(component, match function or None for literal), ...]
+    # and whether the pattern ends with "/" (directory only)
+    dironly = ptn.endswith("/")
+    components = []
+    for component in ptn.rstrip("/").split("/"):
+        if re_magic.search(component):
+            components.append(
+                (component, re.compile(fnmatch.translate(component)).match)
+            )
+        else:
+            components.append((component, None))
+    return (components, dironly)
+
+
+def match_pattern(tree, compiled):
+    # return matched [(path, is_dir, is_file), ...] in the glob order
+    (components, dironly) = compiled
+    matched = [("", True, False)]
+    for i, (component, match) in enumerate(components):
+        last = i == len(components) - 1
+        matched_next = []
+        for dir, dir_is_dir, _ in matched:
+            if not dir_is_dir:
+                continue
+            for name, is_dir, is_file in tree.get(dir, []):
+                if match is None:
+                    if name != component:
+                        continue
+                elif name[:1] == "." and component[:1] != ".":
+                    continue  # hidden files need explicit "."
+                elif not match(name):
+                    continue
+                if (not last or dironly) and not is_dir:
+                    continue
+                matched_next.append((os.path.join(dir, name), is_dir, is_file))
+        matched = matched_next
+    return matched
+
+
+def walk_tree(tree, top):
+    # yield files under top in the os.walk(top) order (top-down)
+    dirs = []
+    for name, is_dir, _ in tree.get(top, []):
+        if is_dir:
+            dirs.append(name)
+        else:
+            yield os.path.join(top, name)
+    for name in dirs:
+        yield from walk_tree(tree, os.path.join(top, name))
+    return
+
+
+def copydiff(mode, pedantic, jobs=1, cache=False, verify=False, save="", load=""):
     ###########################################################################
     # parse existing debian/copyright against source tree
     ###########################################################################
     if not os.path.isfile("debian/copyright"):
         print("E: You need debian/copyright.")
         exit(1)
+    debug_n = debmake.debug.enabled("n")
+    ###########################################################################
+    # scan copyright of the source tree and record all entries on the way
+    ###########################################################################
+    entries = []
+    (data_new, _) = debmake.checkdep5.checkdep5_tree(
+        mode=1,
+        pedantic=pedantic,
+        jobs=jobs,
+        cache=cache,
+        verify=verify,
+        entries=entries,
+        save=save,
+        load=load,
+    )
+    tree = path_tree(entries)
+    compiled_patterns = {}
     with open("debian/copyright", mode="r", encoding="utf-8") as f:
         lines = f.readlines()
     patterns_for_license = []
@@ -63,25 +149,26 @@ def copydiff(mode, pedantic):
                     if ptn == "*":
                         default_license = license
                     iptn += 1  # 0, 1, 2, 3 ...
-                    globbed_file_or_dirs = glob.glob(ptn)
+                    if ptn not in compiled_patterns.keys():
+                        compiled_patterns[ptn] = compile_pattern(ptn)
+                    globbed_file_or_dirs = match_pattern(tree, compiled_patterns[ptn])
                     if globbed_file_or_dirs:
-                        for file_or_dir in globbed_file_or_dirs:
-                            if os.path.isfile(file_or_dir):
+                        for file_or_dir, is_dir, is_file in globbed_file_or_dirs:
+                            if is_file:
                                 file_to_pattern[file_or_dir] = (iptn, ptn)
                                 licenses_old[file_or_dir] = license
-                                debmake.debug.debug(
-                                    "Dn: Pattern #{:02}: {}, file={}, {}".format(
-                                        iptn, ptn, file_or_dir, license
-                                    ),
-                                    type="n",
-                                )
-                            elif os.path.isdir(file_or_dir):
-                                for dir, _, files in os.walk(file_or_dir):
-                                    # debmake.debug.debug('Dn: Pattern #{:02}: {}, dir={}, files={}'.format(iptn, ptn, dir, files), type='n')
-                                    for file in files:
-                                        filepath = os.path.join(dir, file)
-                                        file_to_pattern[filepath] = (iptn, ptn)
-                                        licenses_old[filepath] = license
+                                if debug_n:
+                                    debmake.debug.debug(
+                                        "Dn: Pattern #{:02}: {}, file={}, {}".format(
+                                            iptn, ptn, file_or_dir, license
+                                        ),
+                                        type="n",
+                                    )
+                            elif is_dir:
+                                for filepath in walk_tree(tree, file_or_dir):
+                                    file_to_pattern[filepath] = (iptn, ptn)
+                                    licenses_old[filepath] = license
+                                    if debug_n:
                                         debmake.debug.debug(
                                             "Dn: Pattern #{:02}: {}, filepath={}, {}".format(
                                                 iptn, ptn, filepath, license
@@ -91,12 +178,13 @@ def copydiff(mode, pedantic):
                     else:
                         file_to_pattern["__MISSING__"] = (iptn, ptn)
                         licenses_old["__MISSING__"] = license
-                        debmake.debug.debug(
-                            "Dn: Pattern #{:02}: {}, file={}, {}".format(
-                                iptn, ptn, "__MISSING__", license
-                            ),
-                            type="n",
-                        )
+                        if debug_n:
+                            debmake.debug.debug(
+                                "Dn: Pattern #{:02}: {}, file={}, {}".format(
+                                    iptn, ptn, "__MISSING__", license
+                                ),
+                                type="n",
+                            )
             # Next stanza
             patterns_for_license = []
             license = ""
@@ -122,9 +210,10 @@ def copydiff(mode, pedantic):
     for file, (iptn, ptn) in file_to_pattern.items():
         iptn_to_ptn[iptn] = ptn
         iptn_to_files[iptn].append(file)
-        debmake.debug.debug(
-            'Dn: file="{}", iptn="{}", ptn="{}"'.format(file, iptn, ptn), type="n"
-        )
+        if debug_n:
+            debmake.debug.debug(
+                'Dn: file="{}", iptn="{}", ptn="{}"'.format(file, iptn, ptn), type="n"
+            )
     if nptn != len(iptn_to_ptn):
         print(
             "W: ***** Number of patterns unused: {} out of range(0, {}) *****".format(
@@ -133,23 +222,15 @@ def copydiff(mode, pedantic):
             file=sys.stderr,
         )
     ###########################################################################
-    # scan copyright of the source tree and create license_new[]
+    # create license_new[] from the scan
     ###########################################################################
-    (
-        nonlink_files,
-        _,  # xml_html_files,
-        _,  # binary_files,
-        _,  # huge_files,
-        _,  # extcount,
-        _,  # extcountlist,
-    ) = debmake.scanfiles.scanfiles()
-    data_new = debmake.checkdep5.checkdep5(nonlink_files, mode=1, pedantic=pedantic)
     licenses_new = {}
     for licenseid, _, files, _ in data_new:
         licenseid = licenseid.strip()
-        debmake.debug.debug(
-            'Dn: debian/copyright: "{}": {}'.format(licenseid, files), type="n"
-        )
+        if debug_n:
+            debmake.debug.debug(
+                'Dn: debian/copyright: "{}": {}'.format(licenseid, files), type="n"
+            )
         for file in files:
             licenses_new[file] = licenseid
     ###########################################################################
@@ -191,8 +272,10 @@ def copydiff(mode, pedantic):
     return data
 
 
-def kludge(mode, pedantic):
-    basedata = copydiff(mode, pedantic)
+def kludge(mode, pedantic, jobs=1, cache=False, verify=False, save="", load=""):
+    basedata = copydiff(
+        mode, pedantic, jobs=jobs, cache=cache, verify=verify, save=save, load=load
+    )
     iptn_group_data = []
     for _, g in itertools.groupby(basedata, operator.itemgetter(0)):
         iptn_group_data.append(list(g))  # Store group iterator as a list
@@ -22,9 +22,22 @@ CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
 TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 """
+import atexit
+import hashlib
+import json
 import sys
 import os
 import re
+import time
+import debmake.debug
+
+try:
+    # private modules of CPython re used to find literal anchors of rules
+    import re._casefix as re_casefix
+    import re._constants as re_constants
+    import re._parser as re_parser
+except ImportError:
+    re_casefix = re_constants = re_parser = None
 
 ###############################################################################
 # The regex of devscripts: licensecheck (version  2.14.1) was referenced.
@@ -1265,6 +1278,132 @@ list_main += [
     ("__UNKNOWN__", "", regex(r".*"), []),  # always true
 ]
 ###############################################################################
+# literal anchors of list_main rules (prefilter)
+###############################################################################
+# A rule can match only if all literal substrings required by its top level
+# sequence are found in the text.  For an alternation, one of the literals
+# required by its branches must be found.  Rules without anchors are always
+# tried.  re.IGNORECASE compares the simple lower case of each character and
+# treats some extra characters as equal (re._casefix), e.g. "s" matches "ſ".
+# The texts are folded in the same way before searching anchors in them.
+# The anchors are found with the private modules of re.  If they are missing
+# or changed, all rules are tried without anchors (same results, slower).
+LMIN_ANCHOR = 8  # min length of a literal anchor
+LMIN_BRANCH = 3  # min length of a literal anchor in each branch
+NMAX_ANCHOR = 4  # max number of anchors per rule
+try:
+    fold_table = {c: chr(min((c,) + cs)) for c, cs in re_casefix._EXTRA_CASES.items()}
+except AttributeError:
+    fold_table = None  # case folding of re.IGNORECASE unknown: no anchors
+
+
+def fold(text):
+    # U+0130 is the only character with a multi-character str.lower()
+    return text.replace("\u0130", "i").lower().translate(fold_table or {})
+
+
+def literals(items, branch_list):
+    # return list of literal strings required in the sequence of items
+    # branch_list: tuples of literal strings (one of them is required)
+    literal_list = []
+    literal = ""
+    for op, av in items:
+        if op is re_constants.LITERAL:
+            literal += chr(av)
+        elif op is re_constants.SUBPATTERN and av[1] == 0 and av[2] == 0:
+            # group without inline flags: its sequence is required, too
+            sub_literals = literals(av[3], branch_list)
+            if len(sub_literals) == 1:
+                literal += sub_literals[0]
+            else:
+                literal_list.append(literal + sub_literals[0])
+                literal_list.extend(sub_literals[1:-1])
+                literal = sub_literals[-1]
+        else:
+            if op is re_constants.BRANCH:
+                branch = tuple(
+                    dict.fromkeys(max(literals(x, []), key=len) for x in av[1])
+                )
+                if min(len(x) for x in branch) >= LMIN_BRANCH:
+                    branch_list.append(branch)
+            literal_list.append(literal)
+            literal = ""
+    literal_list.append(literal)
+    return literal_list
+
+
+def anchors(regex):
+    # return tuple of anchors (tuple of folded literals) of a compiled regex
+    # or () to always try the rule if the private modules of re do not help
+    if fold_table is None:
+        return ()
+    branch_list = []
+    try:
+        items = re_parser.parse(regex.pattern, regex.flags)
+        literal_list = literals(items, branch_list)
+    except (AttributeError, TypeError, ValueError):
+        return ()
+    anchor_list = [(x,) for x in literal_list if len(x) >= LMIN_ANCHOR]
+    anchor_list.sort(key=lambda x: len(x[0]), reverse=True)
+    anchor_list += branch_list
+    return tuple(tuple(fold(x) for x in anchor) for anchor in anchor_list[:NMAX_ANCHOR])
+
+
+list_anchors = [anchors(regex) for (license, id, regex, vars) in list_main]
+
+
+###############################################################################
+# search of list_main rules without the tail group
+###############################################################################
+# regex() wraps a rule with the non-greedy head and tail groups anchored at
+# both ends.  Each match of the rule within LMAX_HEAD then extends the tail
+# one character at a time up to LMAX_TAIL before failing on long texts.
+# Search the rule only within LMAX_HEAD instead and check LMAX_TAIL from the
+# end of the match.  If the tail is too long, the rule is matched again
+# with an atomic tail check, which keeps the backtracking order (and groups)
+# of the anchored regex.  A plain unanchored re.search() of the rule is not
+# used: it restarts the match at every offset and scans beyond LMAX_HEAD,
+# which is slower than the non-greedy head.
+rhead1 = r"^(?:.{0," + "{}".format(LMAX_HEAD) + r"}?)"
+rtail1 = r"(?=(?>.{0," + "{}".format(LMAX_TAIL) + r"})$)"
+
+
+def unanchored(regex):
+    # return (search_regex, tail_regex, width) of a list_main regex
+    # width: max length of the match of the rule or None if unbounded
+    pattern = regex.pattern
+    if not (pattern.startswith(rhead0) and pattern.endswith(rtail0)):
+        return (regex, regex, None)
+    reg = pattern[len(rhead0) : len(pattern) - len(rtail0)]
+    try:
+        width = re_parser.parse(reg, regex.flags).getwidth()[1]
+        if width >= re_constants.MAXREPEAT:
+            width = None
+    except (AttributeError, TypeError, ValueError):
+        width = None  # private modules of re missing or changed
+    return (
+        re.compile(rhead1 + reg, regex.flags),
+        re.compile(rhead1 + reg + rtail1, regex.flags),
+        width,
+    )
+
+
+list_search = [unanchored(regex) for (license, id, regex, vars) in list_main]
+
+
+def search(regex_tuple, text):
+    # return the match object of the rule or None
+    # same as regex.search(text) but the head and tail groups are missing
+    (search_regex, tail_regex, width) = regex_tuple
+    if width is not None and len(text) > LMAX_HEAD + width + LMAX_TAIL:
+        return None  # too long to match
+    r = search_regex.search(text)
+    if r is None:
+        return None
+    if len(text) - r.end() <= LMAX_TAIL:
+        return r
+    return tail_regex.search(text)
+###############################################################################
 # exceptions
 ###############################################################################
 list_sub += ["r_autoconf1"]
@@ -1465,6 +1604,250 @@ licensefiles = {
     "LGPL-3.0+": ("LGPL-3", "GNU Lesser General Public License\n Version 3"),
 }
 
+###############################################################################
+# Per-rule profiling counters (off unless profile_enable() is called)
+###############################################################################
+# profile[list][index] = [attempts, hits, skipped, seconds] for each rule of
+# list_main ("main"), list_exceptions ("exception") and list_attributes
+# ("attribute").  attempts count regex searches; seconds is their cumulative
+# time including failed matches; skipped counts list_main rules skipped by
+# anchors without a search.  Counters are kept in this process only.
+PROFILE_VERSION = 1  # bump if the JSON profile format changes
+profile = {
+    "enabled": False,
+    "file": "",
+    "texts": 0,  # texts classified by the rules
+    "main": [],
+    "exception": [],
+    "attribute": [],
+}
+
+
+def profile_enable(file="", report=True):
+    # file: also write the counters as JSON to this file at exit
+    # report: print the profile table on the standard error at exit
+    profile["enabled"] = True
+    profile["file"] = file
+    profile["texts"] = 0
+    profile["main"] = [[0, 0, 0, 0.0] for x in list_main]
+    profile["exception"] = [[0, 0, 0, 0.0] for x in list_exceptions]
+    profile["attribute"] = [[0, 0, 0, 0.0] for x in list_attributes]
+    if report or file:
+        atexit.register(profile_finish, report=report)
+    return
+
+
+def profile_enabled():
+    return profile["enabled"]
+
+
+def profile_count(kind, index, match, start):
+    # count a search of the rule index of kind started at start
+    counters = profile[kind][index]
+    counters[0] += 1
+    counters[1] += bool(match)
+    counters[3] += time.perf_counter() - start
+    return
+
+
+def profile_rules():
+    # return [(list, index, name, counters), ...] of all profiled rules
+    rules = []
+    for i, (license, id, regex, vars) in enumerate(list_main):
+        rules.append(("main", i, license + ":" + id, profile["main"][i]))
+    for i, (re_ex, text_ex, id_ex) in enumerate(list_exceptions):
+        name = text_ex + id_ex
+        rules.append(("exception", i, name, profile["exception"][i]))
+    for i, (re_at, copy_at_at, license_at) in enumerate(list_attributes):
+        name = (copy_at_at or license_at)[:40]
+        rules.append(("attribute", i, name, profile["attribute"][i]))
+    return rules
+
+
+def profile_data():
+    # return the counters as JSON data
+    return {
+        "version": PROFILE_VERSION,
+        "texts": profile["texts"],
+        "rules": [
+            {
+                "list": kind,
+                "index": i,
+                "name": name,
+                "attempts": attempts,
+                "hits": hits,
+                "skipped": skipped,
+                "seconds": round(seconds, 6),
+            }
+            for kind, i, name, (attempts, hits, skipped, seconds) in profile_rules()
+        ],
+    }
+
+
+def profile_report(file=sys.stderr):
+    # print the rules sorted by their cumulative match time
+    rules = sorted(profile_rules(), key=lambda r: (-r[3][3], r[0], r[1]))
+    total = sum(r[3][3] for r in rules)
+    print(
+        "I: license rule profile: {} texts, {:.3f} s in {} rules".format(
+            profile["texts"], total, len(rules)
+        ),
+        file=file,
+    )
+    print(
+        "I: {:<46} {:>8} {:>8} {:>6} {:>9} {:>8} {:>6}".format(
+            "rule", "attempts", "skipped", "hits", "time ms", "us/try", "time%"
+        ),
+        file=file,
+    )
+    for kind, i, name, (attempts, hits, skipped, seconds) in rules:
+        label = "{}:{} {}".format(kind, i, name)[:46]
+        print(
+            "I: {:<46} {:>8} {:>8} {:>6} {:>9.3f} {:>8.1f} {:>6.1f}".format(
+                label,
+                attempts,
+                skipped,
+                hits,
+                seconds * 1000,
+                seconds * 1000000 / max(attempts, 1),
+                seconds * 100 / max(total, 1e-9),
+            ),
+            file=file,
+        )
+    return
+
+
+def profile_finish(report=True):
+    # print the profile table and write the JSON profile (once at exit)
+    if not profile["enabled"]:
+        return
+    profile["enabled"] = False
+    if report:
+        profile_report()
+    if profile["file"]:
+        try:
+            with open(profile["file"], mode="w", encoding="utf-8") as f:
+                json.dump(profile_data(), f, indent=1)
+                f.write("\n")
+        except OSError as e:
+            print(
+                "W: license rule profile not written: {}: {}".format(
+                    profile["file"], e
+                ),
+                file=sys.stderr,
+            )
+        else:
+            print(
+                "I: license rule profile written to {}".format(profile["file"]),
+                file=sys.stderr,
+            )
+    return
+
+
+###############################################################################
+# Verify an evaluation order of list_main rules (e.g., by profiled hits)
+###############################################################################
+# lc_classify() returns the result of the first matching rule of list_main in
+# the source order.  Trying frequent rules first would keep the results only
+# if every rule moved ahead commutes with the rules it passes, i.e., no text
+# is matched by both.  No such pair can be proven: regex() accepts any text
+# before and after the match of a rule, so a text holding the license texts
+# of both rules is matched by both.  verify_order() therefore only checks an
+# order on a corpus: it classifies the texts in the source order and in the
+# order of hits, and counts the swapped rule pairs which a text built from
+# two corpus texts shows to depend on their order.
+def load_hits(file):
+    # return {index: hits} of list_main rules in the JSON profile file
+    # written by --profile
+    try:
+        with open(file, mode="r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        print(
+            "E: license rule profile not read: {}: {}".format(file, e),
+            file=sys.stderr,
+        )
+        exit(1)
+    if not isinstance(data, dict) or data.get("version") != PROFILE_VERSION:
+        print(
+            "E: license rule profile format not supported (need version {}): {}".format(
+                PROFILE_VERSION, file
+            ),
+            file=sys.stderr,
+        )
+        exit(1)
+    hits = {}
+    for rule in data.get("rules", []):
+        if rule.get("list") != "main":
+            continue
+        i = rule.get("index")
+        if i not in range(len(list_main)) or rule.get("name") != "{}:{}".format(
+            list_main[i][0], list_main[i][1]
+        ):
+            print(
+                "E: license rule profile does not match the rules: {}".format(file),
+                file=sys.stderr,
+            )
+            exit(1)
+        hits[i] = rule.get("hits", 0)
+    return hits
+
+
+def verify_order(texts, hits=None):
+    # texts: normalized license texts (corpus)
+    # hits: {index: hits} of list_main rules (see load_hits()) to try rules
+    #       with more hits first; None to try later rules first
+    # return the number of texts classified differently from the source order
+    n = len(list_main)
+    if hits is None:
+        order = list(reversed(range(n)))
+    else:
+        order = sorted(range(n), key=lambda i: -hits.get(i, 0))
+    position = {i: p for p, i in enumerate(order)}
+    swapped = [
+        (i, j) for i in range(n) for j in range(i + 1, n) if position[j] < position[i]
+    ]
+    # a text matched by each rule
+    matched = {}
+    for text in texts:
+        fold_text = fold(text)
+        for i in range(n):
+            if i in matched:
+                continue
+            if all(any(x in fold_text for x in anchor) for anchor in list_anchors[i]):
+                if search(list_search[i], text):
+                    matched[i] = text
+    conflicts = 0
+    for i, j in swapped:
+        if i in matched and j in matched:
+            text = matched[i].strip() + " " + matched[j]
+            if search(list_search[i], text) and search(list_search[j], text):
+                conflicts += 1
+    print(
+        "I: license rule order: {} of {} rule pairs swapped, {} of them matched "
+        "by a common text".format(len(swapped), n * (n - 1) // 2, conflicts),
+        file=sys.stderr,
+    )
+    differ = 0
+    for text in texts:
+        x = lc_classify(text)
+        y = lc_classify(text, order=order)
+        if x != y:
+            differ += 1
+            print(
+                "E: license rule order changes {}:{} to {}:{} for: {}".format(
+                    x[0], x[1], y[0], y[1], text[:64]
+                ),
+                file=sys.stderr,
+            )
+    print(
+        "I: {} of {} texts classified identically in both orders".format(
+            len(texts) - differ, len(texts)
+        ),
+        file=sys.stderr,
+    )
+    return differ
+
 
 #########################################################################################
 def normalize(license_lines):
@@ -1486,8 +1869,6 @@ def lc(norm_text, license_lines, mode):
     # license_lines: original license lines for output
     # mode: license check mode
     # mode = 0: mode for copyright file generation; same as mode == 2 for lc.py
-    if mode == 0:
-        mode = 2
     # abs(mode) = 1: mode for the license scan (1 line output; -c, -cccc)
     # abs(mode) = 2: mode for the license scan (mode = 1 + license text; -cc, -ccccc)
     # abs(mode) = 3: mode for the license scan (mode = 2 + comments; -ccc, -cccccc)
@@ -1497,12 +1878,29 @@ def lc(norm_text, license_lines, mode):
     # mode < 0: add pattern index id (for -cccc, -ccccc, -cccccc)
     # return: text to be placed after "License: "
     #####################################################################################
+    return lc_format(lc_classify(norm_text), license_lines, mode)
+
+
+#########################################################################################
+def lc_classify(norm_text, anchored=False, order=None):
+    # norm_text: normalized license lines to be analyzed
+    # anchored: use the anchored regex of list_main (for benchmark)
+    # order: indices of list_main rules in the order to try them (source order
+    #        if None; only for verify_order())
+    # return: classified data independent of mode and license_lines
+    #   (license, id, version, suffix, exception, multiple_exceptions, copy_at,
+    #    attribs, match_text, norm_text)
+    #   exception: (text_ex, id_ex) or None
+    #   match_text and norm_text are only for debug (mode >= 4)
+    #####################################################################################
     # 1st-line part
     license = ""  # License type: GPL, BSD, ...
     id = ""  # "FULL_LICENSE", "EXACT", ...
     version = ""  # 3
     suffix = ""  #
-    with_exception = ""  #  ' with ' + ... + ' exception'
+    exception = None  # (' with ' + ... + ' exception', id)
+    multiple_exceptions = False
+    copy_at = ""
     match_text = ""  # mode == 4 5 6 ... used by debug
     norm_text = norm_text.strip() + " "  # Ensure a tailing space
     set_attribs = set()
@@ -1552,10 +1950,42 @@ def lc(norm_text, license_lines, mode):
     # elif len(norm_text) > size_FULL:
     # license = '__TOO_LONG_TYPE1__'
     else:
-        for license, id, regex, vars in list_main:
-            r0 = regex.search(norm_text)
+        fold_text = fold(norm_text)
+        found = {}  # found[anchor] = anchor in fold_text
+        debug_t = debmake.debug.enabled("t")
+        skipped = 0  # rules skipped by anchors
+        prof = profile["enabled"]  # count searches of rules
+        if prof:
+            profile["texts"] += 1
+        if order is None:
+            order = range(len(list_main))
+        for i in order:
+            (license, id, regex, vars) = list_main[i]
+            rule_anchors = list_anchors[i]
+            regex_tuple = list_search[i]
+            skip = False
+            for anchor in rule_anchors:
+                for x in anchor:
+                    if x not in found:
+                        found[x] = x in fold_text
+                if not any(found[x] for x in anchor):
+                    skip = True
+                    break
+            if skip:
+                skipped += 1
+                if prof:
+                    profile["main"][i][2] += 1
+                continue
+            if prof:
+                start = time.perf_counter()
+            if anchored:
+                r0 = regex.search(norm_text)
+            else:
+                r0 = search(regex_tuple, norm_text)
+            if prof:
+                profile_count("main", i, r0, start)
             if r0:
-                match_text = r0.group(0)
+                match_text = norm_text  # group(0) of the anchored regex
                 id += "(" + ",".join(vars)
                 try:
                     xname = r0.group("name")
@@ -1605,33 +2035,91 @@ def lc(norm_text, license_lines, mode):
                         )
 
                 # find only first match
+                if debug_t:
+                    debmake.debug.debug(
+                        "Dt: {}:{} ({} rules skipped by anchors)".format(
+                            license, id, skipped
+                        ),
+                        type="t",
+                    )
                 break
         if license == "MPL" and id == "VARIANT2-INCOMPATIBLE" and version == "-2.0":
             version = version + "-no-copyleft-exception"
         # exceptions handling
-        for re_ex, text_ex, id_ex in list_exceptions:
+        for i, (re_ex, text_ex, id_ex) in enumerate(list_exceptions):
+            if prof:
+                start = time.perf_counter()
             r2 = re_ex.search(norm_text)
+            if prof:
+                profile_count("exception", i, r2, start)
             if r2:
-                if mode >= 0:
-                    with_exception = " " + text_ex
-                else:
-                    with_exception = " " + text_ex + id_ex
+                exception = (text_ex, id_ex)
                 break
         # warn multiple exception
         re_exception = re.compile(r_exception)
         n_exceptions = len(re_exception.findall(norm_text))
         if n_exceptions > 1:
-            with_exception += " *** check multiple exceptions ***"
+            multiple_exceptions = True
         # attributes handling
-        for re_at, copy_at, license_at in list_attributes:
+        for i, (re_at, copy_at_at, license_at) in enumerate(list_attributes):
+            if prof:
+                start = time.perf_counter()
             r2 = re_at.search(norm_text)
+            if prof:
+                profile_count("attribute", i, r2, start)
             if r2:
                 if license_at != "":
                     set_attribs.update({license_at})
-                if copy_at != "":
-                    with_exception = " " + copy_at
+                if copy_at_at != "":
+                    copy_at = copy_at_at
         # dual license
         # if re_dual.search(norm_text)
+    return (
+        license,
+        id,
+        version,
+        suffix,
+        exception,
+        multiple_exceptions,
+        copy_at,
+        sorted(set_attribs),
+        match_text,
+        norm_text,
+    )
+
+
+#########################################################################################
+def lc_format(data, license_lines, mode):
+    # data: classified data returned by lc_classify()
+    # license_lines: original license lines for output
+    # mode: license check mode (see lc())
+    # return: text to be placed after "License: "
+    #####################################################################################
+    if mode == 0:
+        mode = 2
+    (
+        license,
+        id,
+        version,
+        suffix,
+        exception,
+        multiple_exceptions,
+        copy_at,
+        set_attribs,
+        match_text,
+        norm_text,
+    ) = data
+    with_exception = ""  #  ' with ' + ... + ' exception'
+    if exception is not None:
+        (text_ex, id_ex) = exception
+        if mode >= 0:
+            with_exception = " " + text_ex
+        else:
+            with_exception = " " + text_ex + id_ex
+    if multiple_exceptions:
+        with_exception += " *** check multiple exceptions ***"
+    if copy_at != "":
+        with_exception = " " + copy_at
     if mode >= 0:
         licenseid = license + version + suffix + with_exception
     else:
@@ -1697,14 +2185,85 @@ def lc_sub(norm_text, mode):
     return text
 
 
+#########################################################################################
+def lc_bench(files, repeat=1):
+    # compare the anchored regex with search() of list_main rules
+    # on the files and on adversarial long inputs derived from them
+    #####################################################################################
+    texts = []
+    for file in files:
+        if os.path.isfile(file):
+            with open(file, mode="r", encoding="utf-8", errors="replace") as f:
+                norm_text = normalize(f.readlines())
+            if norm_text.strip() != "":
+                texts.append(norm_text)
+    junk = "lorem ipsum dolor sit amet, consectetur adipiscing elit. "
+    head = junk * (LMAX_HEAD // len(junk) + 1)
+    tail = junk * (LMAX_TAIL // len(junk) + 1)
+    corpus = [
+        ("files", texts),
+        ("reversed", [". ".join(reversed(x.split(". "))) for x in texts]),
+        ("long head", [head + x for x in texts]),
+        ("long tail", [x + tail for x in texts]),
+        ("repeated", [x * (LMAX_HEAD // len(x) + 1) + tail for x in texts]),
+    ]
+    print(
+        "{:<12}{:>8}{:>12}{:>12}{:>9}".format(
+            "input", "texts", "anchored", "search", "speedup"
+        )
+    )
+    for name, inputs in corpus:
+        elapsed = {}
+        results = {}
+        for anchored in [True, False]:
+            start = time.perf_counter()
+            for i in range(repeat):
+                results[anchored] = [lc_classify(x, anchored=anchored) for x in inputs]
+            elapsed[anchored] = (time.perf_counter() - start) / repeat
+        if results[True] != results[False]:
+            print("E: {}: results differ".format(name), file=sys.stderr)
+        print(
+            "{:<12}{:>8}{:>11.3f}s{:>11.3f}s{:>8.1f}x".format(
+                name,
+                len(inputs),
+                elapsed[True],
+                elapsed[False],
+                elapsed[True] / max(elapsed[False], 1e-9),
+            )
+        )
+    return
+
+
 #########################################################################################
 def lc_main():
     # lc.py entry point
     #####################################################################################
     mode = 1
+    output_format = "text"
+    while len(sys.argv) > 1 and sys.argv[1].split("=")[0] in ("--format", "--profile"):
+        (option, eq, value) = sys.argv.pop(1).partition("=")
+        if option == "--format":
+            # --format=jsonl: one JSON record per file
+            if not eq or value not in ("text", "jsonl"):
+                print(
+                    "E: --format needs =text or =jsonl: {}".format(option + eq + value),
+                    file=sys.stderr,
+                )
+                exit(1)
+            output_format = value
+        elif option == "--profile":
+            # --profile[=file]: report per-rule counters (and write them to file)
+            profile_enable(value)
     argc = len(sys.argv)
     if argc <= 1:
-        print("Syntax: " + sys.argv[0] + " [-][123456] file1 file2 ...")
+        print(
+            "Syntax: "
+            + sys.argv[0]
+            + " [--format=jsonl] [--profile[=file]] [-][123456] file1 file2 ..."
+        )
+        print("        " + sys.argv[0] + " --bench file1 file2 ...")
+    elif sys.argv[1] == "--bench":
+        lc_bench(sys.argv[2:])
     else:
         files = []
         if argc == 2:
@@ -1726,7 +2285,19 @@ def lc_main():
                 while license_lines[-1].strip() == "":
                     del license_lines[-1]
                 norm_text = normalize(license_lines)
-                if abs(mode) <= 1:  # like debmake -c etc.
+                if output_format == "jsonl":
+                    record = {
+                        "file": file,
+                        "md5": hashlib.md5(norm_text.encode()).hexdigest(),
+                    }
+                    if abs(mode) <= 4:
+                        (record["license"], record["text"]) = lc(
+                            norm_text, license_lines, mode
+                        )
+                    else:
+                        record["match"] = lc_sub(norm_text, mode)
+                    print(json.dumps(record), flush=True)
+                elif abs(mode) <= 1:  # like debmake -c etc.
                     (licenseid, text) = lc(norm_text, license_lines, mode)
                     print("{}\t=> {}".format(file, licenseid))
                 elif abs(mode) <= 4:  # like debmake -c etc.
@@ -23,8 +23,8 @@ TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 """
 import os
-import subprocess
 import sys
+import debmake.stage
 
 
 ###########################################################################
@@ -46,10 +46,11 @@ def origtar(package, version, targz, tarball, srcdir):
                 file=sys.stderr,
             )
         else:
-            command = "ln -sf " + tarball + " " + origtargz
-            print("I: $ {}".format(command), file=sys.stderr)
-            if subprocess.call(command, shell=True) != 0:
-                print("E: failed to create symlink.", file=sys.stderr)
+            # ln -sf tarball origtargz
+            try:
+                debmake.stage.symlink(tarball, origtargz)
+            except OSError as e:
+                print("E: failed to create symlink: {}".format(e), file=sys.stderr)
                 exit(1)
     elif os.path.isfile(origtargz):
         print(
@@ -119,9 +119,9 @@ Argument may need to be quoted to protect from the shell.
     sp.add_argument(
         "-t",
         "--tar",
-        action="store_true",
-        default=False,
-        help='run "tar" to generate upstream tarball and use it',
+        action="count",
+        default=0,
+        help='run "tar" to generate upstream tarball and use it (-tt: via a copy in package-version/)',
     )
     p.add_argument(
         "-p",
@@ -152,7 +152,7 @@ Argument may need to be quoted to protect from the shell.
         "--targz",
         action="store",
         default="*",
-        help="set the tarball type, extension=(tar.gz|tar.bz2|tar.xz)",
+        help="set the tarball type, extension=(tar.gz|tar.bz2|tar.xz|tar.zst)",
         metavar="extension",
     )
     p.add_argument(
@@ -270,6 +270,67 @@ Argument may need to be quoted to protect from the shell.
         default=False,
         help="generate configuration files for the local package",
     )
+    p.add_argument(
+        "-J",
+        "--jobs",
+        type=int,
+        action="store",
+        default=1,
+        help="scan source for copyright+license text with N parallel jobs (0: all CPUs)",
+        metavar="N",
+    )
+    p.add_argument(
+        "--no-cache",
+        action="store_false",
+        default=True,
+        dest="cache",
+        help="do not use the persistent scan cache in $XDG_CACHE_HOME/debmake",
+    )
+    p.add_argument(
+        "--cache-verify",
+        action="store_true",
+        default=False,
+        help="check the content digest of files found in the scan cache",
+    )
+    p.add_argument(
+        "--watch",
+        action="store",
+        default="",
+        help="write the -c output to file and keep it updated while the source changes",
+        metavar="file",
+    )
+    p.add_argument(
+        "--save-scan",
+        action="store",
+        default="",
+        help="save the copyright+license scan of the source to a snapshot file",
+        metavar="file",
+    )
+    p.add_argument(
+        "--load-scan",
+        action="store",
+        default="",
+        help="use the snapshot file of --save-scan instead of scanning the source",
+        metavar="file",
+    )
+    p.add_argument(
+        "--timings",
+        nargs="?",
+        const="",
+        default=None,
+        action="store",
+        help="report wall time, CPU time and peak RSS so far at the end of each phase (and write it to file as JSON)",
+        metavar="file",
+    )
+    p.add_argument(
+        "--lc-profile",
+        nargs="?",
+        const="",
+        default=None,
+        action="store",
+        help="report per-rule counters of the license classification (and write them to file as JSON)",
+        metavar="file",
+    )
     p.add_argument(
         "-P",
         "--pedantic",
@@ -327,6 +388,7 @@ Argument may need to be quoted to protect from the shell.
     para["revision"] = args.revision  # -r
     para["spec"] = args.spec  # -s
     para["tar"] = args.tar  # -t
+    # 0: no tar, 1: tar the current directory as srcdir, 2: tar a copy in srcdir
     para["version"] = args.upstreamversion  # -u
     para["print_version"] = args.version  # -v
     ############################################# -w
@@ -341,6 +403,17 @@ Argument may need to be quoted to protect from the shell.
     # 0: ask, 1: yes, 2: no
     para["targz"] = args.targz  # -z
     para["local"] = args.local  # -L
+    para["jobs"] = args.jobs  # -J
+    para["cache"] = args.cache  # --no-cache
+    para["cache_verify"] = args.cache_verify  # --cache-verify
+    para["watch"] = args.watch  # --watch
+    if para["watch"] and para["copyright"] == 0 and para["kludge"] == 0:
+        para["copyright"] = 1  # --watch implies -c
+    para["save_scan"] = args.save_scan  # --save-scan
+    para["load_scan"] = args.load_scan  # --load-scan
+    para["timings"] = args.timings  # --timings
+    # None: no report, "": report, file: report and write it to file
+    para["lc_profile"] = args.lc_profile  # --lc-profile
     para["pedantic"] = args.pedantic  # -P
     para["tutorial"] = args.tutorial  # -T
     if para["copyright"] >= 3:
@@ -26,8 +26,9 @@ import datetime
 import glob
 import os
 import re
-import subprocess
 import sys
+import debmake.stage
+import debmake.timing
 
 
 ###########################################################################
@@ -56,7 +57,7 @@ def sanity(para):
                 print("E: please install wget or curl.", file=sys.stderr)
                 exit(1)
             print("I: $ {}".format(command), file=sys.stderr)
-            if subprocess.call(command, shell=True) != 0:
+            if debmake.timing.call(command, shell=True) != 0:
                 print("E: wget/curl failed.", file=sys.stderr)
                 exit(1)
         # tarball: ibus-1.5.5-2.fc19.src.rpm
@@ -67,13 +68,14 @@ def sanity(para):
         if resrcrpm:
             command = "rpm2cpio " + para["tarball"] + "|cpio -dium"
             print("I: $ {}".format(command), file=sys.stderr)
-            if subprocess.call(command, shell=True) != 0:
+            if debmake.timing.call(command, shell=True) != 0:
                 print("E: rpm2cpioc ... | cpio -dium failed.", file=sys.stderr)
                 exit(1)
             files = (
                 glob.glob(resrcrpm.group(1) + "*.tar.gz")
                 + glob.glob(resrcrpm.group(1) + "*.tar.bz2")
                 + glob.glob(resrcrpm.group(1) + "*.tar.xz")
+                + glob.glob(resrcrpm.group(1) + "*.tar.zst")
             )
             if files:
                 para["tarball"] = files[0]
@@ -87,19 +89,26 @@ def sanity(para):
             )
             exit(1)
         if os.path.abspath(os.path.dirname(para["tarball"])) != os.getcwd():
-            command = "cp " + para["tarball"] + " " + os.path.basename(para["tarball"])
-            print("I: $ {}".format(command), file=sys.stderr)
-            if subprocess.call(command, shell=True) != 0:
-                print("E: {} failed.".format(command), file=sys.stderr)
+            try:
+                debmake.stage.stage(
+                    para["tarball"], os.path.basename(para["tarball"])
+                )
+            except OSError as e:
+                print(
+                    "E: failed to copy {}: {}".format(para["tarball"], e),
+                    file=sys.stderr,
+                )
                 exit(1)
         para["tarball"] = os.path.basename(para["tarball"])
         # tarball: package_version.orig.tar.gz
         reorigtar = re.match(
-            r"([^/_]+)_([^-/_]+)\.orig\.(tar\.gz|tar\.bz2|tar\.xz)$", para["tarball"]
+            r"([^/_]+)_([^-/_]+)\.orig\.(tar\.gz|tar\.bz2|tar\.xz|tar\.zst)$",
+            para["tarball"],
         )
         # tarball: package-version.tar.gz or package_version.tar.gz
         rebasetar = re.match(
-            r"([^/_]+)[-_]([^-/_]+)\.(tar\.gz|tar\.bz2|tar\.xz)$", para["tarball"]
+            r"([^/_]+)[-_]([^-/_]+)\.(tar\.gz|tar\.bz2|tar\.xz|tar\.zst)$",
+            para["tarball"],
         )
         if reorigtar:
             package = reorigtar.group(1).lower()
@@ -164,7 +173,7 @@ def sanity(para):
             )
     #######################################################################
     if para["archive"]:  # -a
-        if para["targz"] == "":
+        if para["targz"] in ("", "*"):  # "*" is the -z default
             para["targz"] = targz
         elif para["targz"] != targz:
             print(
@@ -181,18 +190,14 @@ def sanity(para):
         # sanity check and set para['targz'] for short forms
         if para["targz"] == "*": # default: resolve later
             pass
-        elif para["targz"][0] == "g":
+        elif para["targz"] in ("zst", "zstd", "tar.zst"):
+            para["targz"] = "tar.zst"
+        elif para["targz"] in ("z", "g", "gz", "gzip", "tar.gz"):
             para["targz"] = "tar.gz"
-        elif para["targz"][0] == "b":
+        elif para["targz"] in ("b", "bz2", "bzip2", "tar.bz2"):
             para["targz"] = "tar.bz2"
-        elif para["targz"][0] == "x":
+        elif para["targz"] in ("x", "xz", "tar.xz"):
             para["targz"] = "tar.xz"
-        elif para["targz"] == "tar.gz":
-            pass
-        elif para["targz"] == "tar.bz2":
-            pass
-        elif para["targz"] == "tar.xz":
-            pass
         else:
             print(
                 "E: --targz (-z) value is invalid: {}".format(para["targz"]),
@@ -239,12 +244,21 @@ def sanity(para):
                 para["targz"] = "tar.gz"
             elif os.path.isfile("../" + para["package"] + "_" + para["version"] + ".orig.tar.bz2"):
                 para["targz"] = "tar.bz2"
+            elif os.path.isfile("../" + para["package"] + "-" + para["version"] + ".tar.zst"):
+                para["targz"] = "tar.zst"
+            elif os.path.isfile("../" + para["package"] + "_" + para["version"] + ".orig.tar.zst"):
+                para["targz"] = "tar.zst"
             else:
                 print(
                     "E: upstream tarball missing for -p {} -u {}".format(para["package"], para["version"]), file=sys.stderr
                 )
                 exit(1)
         para["tarball"] = para["package"] + "-" + para["version"] + "." + para["targz"]
+    if para["targz"] == "tar.zst" and not para["native"]:
+        print(
+            "W: tar.zst orig tarball may not be accepted by dpkg-source or the archive.",
+            file=sys.stderr,
+        )
     #######################################################################
     if para["revision"] == "":
         para["revision"] = "1"
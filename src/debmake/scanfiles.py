@@ -23,15 +23,27 @@ TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 """
 import collections
+import contextlib
 import operator
 import os
+import queue
 import re
+import shutil
+import subprocess
 import sys
+import tarfile
+import threading
+import debmake.timing
 
 ###################################################################
 # Define constants
 ###################################################################
 MAX_FILE_SIZE = 1024 * 1024  # 1 MiB
+HEAD_SIZE = 16 * 1024  # bytes read from each file while walking the tree
+MAX_CONTENTS_SIZE = 64 * 1024 * 1024  # 64 MiB of small files kept in memory
+QUEUE_SIZE = 64  # batches of files the walker thread may run ahead
+BATCH_SIZE = 64  # files handed over at once by the walker thread
+MAX_AHEAD_SIZE = 8 * MAX_FILE_SIZE  # bytes of contents the walker may run ahead
 SKIP_FILES = [
     "COPYING",
     "LICENSE",
@@ -62,6 +74,8 @@ SKIP_FILES = [
 
 # First 2 are specified by --license
 
+VCS_DIRS = ["CVS", ".svn", ".pc", ".git", ".hg", ".bzr"]  # not scanned
+
 extequiv = {
     "pl": "perl",
     "PL": "perl",
@@ -142,8 +156,7 @@ re_ext = re.compile(r"\.(?P<ext>[^.]+)(?:\.in|\.gz|\.bz2|\.xz|\.Z\|.z|~)*$")
 ###################################################################
 # Check if binary file
 ###################################################################
-def typefile(file, blocksize=4048):
-    buff = open(file, mode="rb").read(blocksize)
+def typebuffer(buff):
     if b"<" == buff[:1]:
         return 2  # XML/SGML/HTML
     # This code is disabled since we use UTF-8 decoding error as indicator
@@ -155,73 +168,402 @@ def typefile(file, blocksize=4048):
         return 1  # Text
 
 
+def typefile(file, blocksize=4048):
+    with open(file, mode="rb") as f:
+        buff = f.read(blocksize)
+    return typebuffer(buff)
+
+
 ###################################################################
-# Get all files to be analyzed under dir
+# Classify a file to be analyzed
 ###################################################################
-def get_all_files():
-    nonlink_files = []
-    binary_files = []
-    xml_html_files = []
-    huge_files = []
-    extensions = []
-    # extensions : representative code type
+def get_extrep(file):
+    # return the representative code type of the file name extension or None
+    re_ext_match = re_ext.search(file)
+    if re_ext_match:
+        ext = re_ext_match.group("ext")
+        if ext in extequiv.keys():
+            return extequiv[ext]
+        return ext
+    return None
+
+
+def kind_of_file(filepath):
+    # return (kind, buff, size) with kind as yielded by iter_all_files(), buff
+    # as the first HEAD_SIZE bytes of the file and size of the file
+    with open(filepath, mode="rb") as f:
+        buff = f.read(HEAD_SIZE)
+        if len(buff) < HEAD_SIZE:
+            size = len(buff)  # whole file read
+        else:
+            size = os.fstat(f.fileno()).st_size
+    type_of_file = typebuffer(buff)
+    if type_of_file == 2:  # XML/SGML/HTML
+        kind = "xml_html"
+    elif type_of_file == 0:  # Binary
+        kind = "binary"
+    elif size > MAX_FILE_SIZE:
+        kind = "huge"
+    else:  # type_of_file == 1 Text
+        kind = "nonlink"
+    return (kind, buff, size)
+
+
+###################################################################
+# Walk the tree under "." (same order as os.walk)
+###################################################################
+# Yield (dirpath, dir_entries, file_entries) for each directory, top-down.
+# dirpath is relative to "." ("" for "."), entries are os.DirEntry objects.
+# File type and symlink status come from the DirEntry without extra
+# stat calls.  dir_entries may be modified in place to prune the walk.
+# entries: list to be extended with (path, is_dir, is_file) for every entry
+# in the scandir order (is_dir and is_file follow symlinks)
+# top: directory relative to "." to start the walk from ("" for ".")
+def walk_entries(entries=None, top=""):
+    stack = [top]
+    while stack:
+        dirpath = stack.pop()
+        dir_entries = []
+        file_entries = []
+        try:
+            with os.scandir(dirpath or ".") as it:
+                for entry in it:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if is_dir:
+                        dir_entries.append(entry)
+                    else:
+                        file_entries.append(entry)
+                    if entries is not None:
+                        try:
+                            is_file = entry.is_file()
+                        except OSError:
+                            is_file = False
+                        path = os.path.join(dirpath, entry.name)
+                        entries.append((path, is_dir, is_file))
+        except OSError:
+            continue  # skip unreadable dir as os.walk
+        yield (dirpath, dir_entries, file_entries)
+        for entry in reversed(dir_entries):
+            stack.append(os.path.join(dirpath, entry.name))
+    return
+
+
+###################################################################
+# Iterate over all files to be analyzed under dir
+###################################################################
+# Yield (kind, filepath, extrep) in the walk order where kind is one of
+# "nonlink", "xml_html", "binary" and "huge" and extrep is the representative
+# code type of the file name extension (None if no extension).
+# contents: dict to be filled as {filepath: bytes} with the whole content
+# of small text files so they are not read again by the license parser
+# entries: list to be extended by walk_entries() with all walked entries
+def iter_all_files(contents=None, entries=None):
     # binary means possible non-DFSG component
-    for dir, subdirs, files in os.walk("."):
-        for file in files:
-            # dir iterates over ./ ./foo ./foo/bar/ ./foo/bar/baz ...
-            filepath = os.path.join(dir[2:], file)
-            if os.path.islink(filepath):
+    contents_size = 0
+    for dir, subdirs, dir_files in walk_entries(entries=entries):
+        for entry in dir_files:
+            file = entry.name
+            # dir iterates over "" foo foo/bar foo/bar/baz ...
+            filepath = os.path.join(dir, file)
+            if entry.is_symlink():
                 pass  # skip symlink (both for file and dir)
             elif file in SKIP_FILES:
                 pass  # skip automatically generated files
             elif filepath == "debian/copyright":
                 pass  # skip debian/copyrit
             else:
-                re_ext_match = re_ext.search(file)
-                if re_ext_match:
-                    ext = re_ext_match.group("ext")
-                    if ext in extequiv.keys():
-                        extrep = extequiv[ext]
-                    else:
-                        extrep = ext
-                    extensions.append(extrep)
-                type_of_file = typefile(filepath)
-                if type_of_file == 2:  # XML/SGML/HTML
-                    xml_html_files.append(filepath)
-                elif type_of_file == 0:  # Binary
-                    binary_files.append(filepath)
-                elif os.path.getsize(filepath) > MAX_FILE_SIZE:
-                    huge_files.append(filepath)
-                else:  # type_of_file == 1 Text
-                    nonlink_files.append(filepath)
-        # do not decend to VCS dirs
-        for vcs in ["CVS", ".svn", ".pc", ".git", ".hg", ".bzr"]:
-            if vcs in subdirs:
-                subdirs.remove(vcs)  # skip VCS
-        # do not decend to symlink dirs
-        symlinks = []
-        for subdir in subdirs:
-            dirpath = os.path.join(dir, subdir)
-            if os.path.islink(dirpath):
-                symlinks.append(subdir)
+                extrep = get_extrep(file)
+                (kind, buff, size) = kind_of_file(filepath)
+                if (
+                    kind == "nonlink"
+                    and contents is not None
+                    and len(buff) == size
+                    and contents_size + size <= MAX_CONTENTS_SIZE
+                ):
+                    contents[filepath] = buff  # whole file read
+                    contents_size += size
+                yield (kind, filepath, extrep)
+        # do not decend to VCS dirs and symlink dirs
         # do not change subdirs inside looping over subdirs
-        for symlink in symlinks:
-            subdirs.remove(symlink)  # skip symlinks
-            print("W: get_all_files(dir) skip symlink dir", file=sys.stderr)
-    return (nonlink_files, xml_html_files, binary_files, huge_files, extensions)
+        subdirs_new = []
+        for subdir in subdirs:
+            if subdir.name in VCS_DIRS:
+                pass  # skip VCS
+            elif subdir.is_symlink():
+                print("W: get_all_files(dir) skip symlink dir", file=sys.stderr)
+            else:
+                subdirs_new.append(subdir)
+        subdirs[:] = subdirs_new
+    return
+
+
+###################################################################
+# Iterate over all files to be analyzed in the tarball
+###################################################################
+# Yield the same records as iter_all_files() for the tree extracted from
+# tarball without extracting it.  Member names are relative to the single
+# top-level directory of the tarball.  The content of every text file is
+# stored in contents since it can not be read again later.  A hard link to
+# a text file is yielded after all other members with the content of its
+# target read in a second pass over the tarball.
+def iter_tar_files(tarball, contents):
+    links = {}  # links[target name] = [(filepath, extrep), ...]
+    with open_tar(tarball) as tar:
+        yield from iter_tar_members(tar, contents, links)
+    if not links:
+        return
+    with open_tar(tarball) as tar:
+        for member in tar:
+            name = tar_member_name(member.name)
+            if name not in links or not member.isreg():
+                continue
+            with tar.extractfile(member) as f:
+                content = f.read()
+            for filepath, extrep in links.pop(name):
+                contents[filepath] = content
+                yield ("nonlink", filepath, extrep)
+            if not links:
+                break
+    for name in links:
+        print(
+            "W: iter_tar_files(tarball) skip hard link to: {}".format(name),
+            file=sys.stderr,
+        )
+    return
+
+
+@contextlib.contextmanager
+def open_tar(tarball):
+    # open tarball as a stream of members (tarfile can not decompress zstd)
+    if not tarball.endswith(".tar.zst"):
+        with tarfile.open(tarball, mode="r|*") as tar:
+            yield tar
+        return
+    if shutil.which("pzstd"):
+        command = ["pzstd", "-d", "-c", "-q", tarball]
+    else:
+        command = ["zstd", "-d", "-c", "-q", "-T0", tarball]
+    with debmake.timing.command_phase(command), subprocess.Popen(
+        command, stdout=subprocess.PIPE
+    ) as proc:
+        with tarfile.open(fileobj=proc.stdout, mode="r|") as tar:
+            yield tar
+        # drain the rest after a second pass stopped early
+        while proc.stdout.read(HEAD_SIZE):
+            pass
+    if proc.returncode != 0:
+        raise OSError("{} failed".format(" ".join(command)))
+    return
+
+
+def tar_member_name(name):
+    # return the member name without "./" and trailing "/"
+    while name.startswith("./"):
+        name = name[2:]
+    return name.rstrip("/")
+
+
+# links: dict filled with {target name: [(filepath, extrep), ...]} for hard
+# links to text files which are not yielded here
+def iter_tar_members(tar, contents, links):
+    top = None
+    kinds = {}  # kinds[name] = kind of regular members read
+    for member in tar:
+        name = tar_member_name(member.name)
+        if name in ("", "."):
+            if top is None:
+                top = ""  # made by "tar -C dir ." without top-level directory
+            continue
+        if top is None:
+            if "/" in name or member.isdir():
+                top = name.split("/")[0]
+            else:
+                top = ""  # no top-level directory
+        if top and name == top:
+            continue  # top-level directory
+        elif top and name.startswith(top + "/"):
+            filepath = name[len(top) + 1 :]
+        else:
+            filepath = name
+        (dir, file) = os.path.split(filepath)
+        if member.islnk():
+            # a hard link is the same file as its target read before
+            target = tar_member_name(member.linkname)
+            kind = kinds.get(target)
+            if kind is None:
+                print(
+                    "W: iter_tar_files(tarball) skip hard link: {}".format(filepath),
+                    file=sys.stderr,
+                )
+                continue
+        elif not member.isreg():
+            continue  # skip symlink, directory, device, ...
+        else:
+            kind = None
+        if set(dir.split("/")) & set(VCS_DIRS):
+            pass  # skip VCS
+        elif file in SKIP_FILES:
+            pass  # skip automatically generated files
+        elif filepath == "debian/copyright":
+            pass  # skip debian/copyrit
+        elif kind == "nonlink":
+            # content of the target is read again in a second pass
+            links.setdefault(target, []).append((filepath, get_extrep(file)))
+        else:
+            extrep = get_extrep(file)
+            if kind is None:
+                with tar.extractfile(member) as f:
+                    buff = f.read(HEAD_SIZE)
+                    type_of_file = typebuffer(buff)
+                    if type_of_file == 2:  # XML/SGML/HTML
+                        kind = "xml_html"
+                    elif type_of_file == 0:  # Binary
+                        kind = "binary"
+                    elif member.size > MAX_FILE_SIZE:
+                        kind = "huge"
+                    else:  # type_of_file == 1 Text
+                        kind = "nonlink"
+                        contents[filepath] = buff + f.read()
+                kinds[name] = kind
+            yield (kind, filepath, extrep)
+    return
+
+
+###################################################################
+# Run iterator in a walker thread ahead of its consumer
+###################################################################
+# Items are handed over in batches through a bounded queue, so the walker
+# blocks when it is QUEUE_SIZE batches ahead.  weigh(item) returns the bytes
+# held for an item (e.g. its content read while walking) and the walker also
+# blocks while the items not yet consumed hold maxbytes or more.  Exceptions
+# raised by the iterator are raised again in the consumer.
+def iter_ahead(iterator, maxsize=QUEUE_SIZE, weigh=None, maxbytes=MAX_AHEAD_SIZE):
+    fifo = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+    held = threading.Condition()
+    ahead = {"bytes": 0}  # bytes held by items not yet consumed
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                fifo.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def wait():
+        with held:
+            while ahead["bytes"] >= maxbytes and not stop.is_set():
+                held.wait(timeout=0.1)
+        return not stop.is_set()
+
+    def walker():
+        try:
+            batch = []
+            with debmake.timing.phase("walk"):
+                for item in iterator:
+                    weight = weigh(item) if weigh is not None else 0
+                    batch.append((item, weight))
+                    with held:
+                        ahead["bytes"] += weight
+                        full = ahead["bytes"] >= maxbytes
+                    # hand over at once if the consumer is waiting
+                    if len(batch) >= BATCH_SIZE or fifo.empty() or full:
+                        if not put((batch, False, None)):
+                            return
+                        batch = []
+                    if full and not wait():
+                        return
+            put((batch, True, None))
+        except Exception as e:
+            put(([], True, e))
+        return
+
+    thread = threading.Thread(target=walker, name="walker", daemon=True)
+    thread.start()
+    try:
+        while True:
+            (batch, done, e) = fifo.get()
+            for item, weight in batch:
+                yield item
+                if weight:
+                    with held:
+                        ahead["bytes"] -= weight
+                        held.notify()
+            if e is not None:
+                raise e
+            elif done:
+                break
+    finally:
+        stop.set()
+        thread.join()
+    return
+
+
+###################################################################
+# Get all files to be analyzed under dir
+###################################################################
+def get_all_files(contents=None):
+    scan = new_scan()
+    for _ in scan_tree(scan, contents=contents, ahead=False):
+        pass
+    return (
+        scan["nonlink_files"],
+        scan["xml_html_files"],
+        scan["binary_files"],
+        scan["huge_files"],
+        scan["extensions"],
+    )
+
+
+def new_scan():
+    # extensions : representative code type
+    return {
+        "nonlink_files": [],
+        "xml_html_files": [],
+        "binary_files": [],
+        "huge_files": [],
+        "extensions": [],
+    }
+
+
+###################################################################
+# Stream text files to the license scanner while walking the tree
+###################################################################
+# Yield each text file (nonlink_files) as soon as it is found and fill
+# scan (from new_scan()) with all lists of get_all_files() on the way.
+# ahead: run the walk in a thread to overlap directory traversal with
+# the work done by the consumer on each yielded file
+# tarball: scan members of this tarball instead of the tree under "."
+# entries: list to be extended with all entries walked (not for tarball)
+def scan_tree(scan, contents=None, ahead=True, tarball="", entries=None):
+    if tarball:
+        records = iter_tar_files(tarball, contents)
+    else:
+        records = iter_all_files(contents=contents, entries=entries)
+    if ahead and contents is not None:
+        # bound the contents read ahead of the consumer, too
+        records = iter_ahead(records, weigh=lambda r: len(contents.get(r[1], b"")))
+    elif ahead:
+        records = iter_ahead(records)
+    for kind, filepath, extrep in records:
+        if extrep is not None:
+            scan["extensions"].append(extrep)
+        scan[kind + "_files"].append(filepath)
+        if kind == "nonlink":
+            yield filepath
+    return
 
 
 #######################################################################
-# complete scanfiles
+# report file extensions of scan_tree() results
 #######################################################################
-def scanfiles():
-    (
-        nonlink_files,
-        xml_html_files,
-        binary_files,
-        huge_files,
-        extensions,
-    ) = get_all_files()
+def scan_report(scan):
+    extensions = scan["extensions"]
     if len(extensions):
         delta = 100.0 / len(extensions)
     else:
@@ -232,16 +574,28 @@ def scanfiles():
         if ext == "binary" or ext == "archive":
             print("W: {} type exists.  Maybe non-DFSG!".format(ext), file=sys.stderr)
         print("I: {1:3.0f} %, ext = {0}".format(ext, count * delta), file=sys.stderr)
+    # sorted since the walk order depends on the filesystem (or tarball)
     return (
-        nonlink_files,
-        xml_html_files,
-        binary_files,
-        huge_files,
+        scan["nonlink_files"],
+        sorted(scan["xml_html_files"]),
+        sorted(scan["binary_files"]),
+        sorted(scan["huge_files"]),
         counter,
         count_list,
     )
 
 
+#######################################################################
+# complete scanfiles
+#######################################################################
+def scanfiles(contents=None):
+    scan = new_scan()
+    with debmake.timing.phase("walk"):
+        for _ in scan_tree(scan, contents=contents, ahead=False):
+            pass
+    return scan_report(scan)
+
+
 #######################################################################
 # Test script
 #######################################################################
@@ -0,0 +1,150 @@
+#!/usr/bin/python3
+# vim:se tw=0 sts=4 ts=4 et ai:
+"""
+Copyright © 2024 Osamu Aoki
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the
+"Software"), to deal in the Software without restriction, including
+without limitation the rights to use, copy, modify, merge, publish,
+distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to
+the following conditions:
+
+The above copyright notice and this permission notice shall be included
+in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+import gzip
+import json
+import os
+import sys
+import debmake
+import debmake.debug
+
+###################################################################
+# Scan result snapshot for --save-scan and --load-scan
+###################################################################
+# One scan of the source tree is rendered by debmake -c (any mode),
+# debmake -k and the full debianization alike.  The snapshot keeps the
+# mode independent scan result:
+#   sdata:   license scan (see debmake.checkdep5.scan_all_licenses())
+#   scan:    file lists and extensions (see debmake.scanfiles.new_scan())
+#   entries: (path, is_dir, is_file) of the walked tree for debmake -k
+# It is a compact JSON file (gzip compressed if its name ends with .gz).
+###################################################################
+SNAPSHOT_VERSION = 1  # bump if the snapshot format changes
+
+
+def open_snapshot(file, mode, name=""):
+    # name: file name deciding the compression if file is a temporary one
+    if (name or file).endswith(".gz"):
+        return gzip.open(file, mode + "t", encoding="utf-8")
+    return open(file, mode, encoding="utf-8")
+
+
+def save_scan(file, sdata, scan, entries, pedantic=False, tarball=""):
+    snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "debmake": debmake.__version__,
+        "pedantic": pedantic,
+        "tarball": tarball,
+        "count": sdata["count"],
+        "debug": sdata["debug"],
+        "files": sdata["files"],
+        "licenses": sdata["licenses"],
+        "scan": scan,
+        "entries": entries,
+    }
+    # file names are kept as is with surrogate escapes by ensure_ascii
+    tmp = "{}.{}.tmp".format(file, os.getpid())
+    try:
+        with open_snapshot(tmp, "w", name=file) as f:
+            json.dump(snapshot, f, separators=(",", ":"))
+        os.replace(tmp, file)
+    except OSError as e:
+        print("E: scan snapshot not saved: {}: {}".format(file, e), file=sys.stderr)
+        exit(1)
+    print(
+        "I: scan snapshot saved for {} files: {}".format(sdata["count"], file),
+        file=sys.stderr,
+    )
+    return
+
+
+def load_scan(file, pedantic=False):
+    # return (sdata, scan, entries) saved by save_scan()
+    try:
+        with open_snapshot(file, "r") as f:
+            snapshot = json.load(f)
+    except (OSError, EOFError, ValueError) as e:
+        print("E: scan snapshot not loaded: {}: {}".format(file, e), file=sys.stderr)
+        exit(1)
+    if not isinstance(snapshot, dict) or snapshot.get("version") != SNAPSHOT_VERSION:
+        print(
+            "E: scan snapshot format not supported (need version {}): {}".format(
+                SNAPSHOT_VERSION, file
+            ),
+            file=sys.stderr,
+        )
+        exit(1)
+    if snapshot["pedantic"] != pedantic:
+        print(
+            "E: scan snapshot made {} -P (--pedantic): {}".format(
+                "with" if snapshot["pedantic"] else "without", file
+            ),
+            file=sys.stderr,
+        )
+        exit(1)
+    if snapshot["debmake"] != debmake.__version__:
+        print(
+            "W: scan snapshot made by debmake {}: {}".format(snapshot["debmake"], file),
+            file=sys.stderr,
+        )
+    debmake.debug.debug(
+        "Dh: load scan snapshot: {} (tarball={})".format(file, snapshot["tarball"]),
+        type="h",
+    )
+    licenses = {}
+    for k, (data, norm_text, license_lines) in snapshot["licenses"].items():
+        if data[4] is not None:
+            data[4] = tuple(data[4])  # exception
+        licenses[k] = (tuple(data), norm_text, license_lines)
+    sdata = {
+        "files": [
+            (
+                path,
+                md5hashkey,
+                {name: tuple(years) for name, years in copyright_data.items()},
+            )
+            for path, md5hashkey, copyright_data in snapshot["files"]
+        ],
+        "licenses": licenses,
+        "count": snapshot["count"],
+        "debug": snapshot["debug"],
+    }
+    entries = [tuple(entry) for entry in snapshot["entries"]]
+    print(
+        "I: scan snapshot loaded for {} files: {}".format(sdata["count"], file),
+        file=sys.stderr,
+    )
+    return (sdata, snapshot["scan"], entries)
+
+
+#######################################################################
+# Test script
+#######################################################################
+if __name__ == "__main__":
+    (sdata, scan, entries) = load_scan(sys.argv[1])
+    print("files:    {}".format(len(sdata["files"])))
+    print("licenses: {}".format(len(sdata["licenses"])))
+    print("entries:  {}".format(len(entries)))
+    for kind in ["nonlink", "xml_html", "binary", "huge"]:
+        print("{}: {}".format(kind, len(scan[kind + "_files"])))
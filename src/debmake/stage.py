@@ -0,0 +1,155 @@
+#!/usr/bin/python3
+# vim:se tw=0 sts=4 ts=4 et ai:
+"""
+Copyright © 2024 Osamu Aoki
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the
+"Software"), to deal in the Software without restriction, including
+without limitation the rights to use, copy, modify, merge, publish,
+distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to
+the following conditions:
+
+The above copyright notice and this permission notice shall be included
+in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+import errno
+import fcntl
+import os
+import shutil
+import stat
+import sys
+
+###########################################################################
+# Define constants
+###########################################################################
+FICLONE = 0x40049409  # _IOW(0x94, 9, int) from <linux/fs.h>
+COPY_SIZE = 64 * 1024 * 1024  # bytes copied at once in the kernel
+
+
+###########################################################################
+# copy data between file descriptors in the kernel
+###########################################################################
+def copy_range(fd_src, fd_dst, size):
+    offset = 0
+    while offset < size:
+        n = os.copy_file_range(fd_src, fd_dst, min(COPY_SIZE, size - offset))
+        if n == 0:
+            break
+        offset += n
+    return offset
+
+
+def copy_sendfile(fd_src, fd_dst, size):
+    offset = 0
+    while offset < size:
+        n = os.sendfile(fd_dst, fd_src, offset, min(COPY_SIZE, size - offset))
+        if n == 0:
+            break
+        offset += n
+    return offset
+
+
+###########################################################################
+# copy data of f_src to f_dst (empty) and return the name of the strategy
+###########################################################################
+def copy_data(f_src, f_dst, size):
+    for name, copy in (
+        ("copy_file_range", copy_range),
+        ("sendfile", copy_sendfile),
+    ):
+        try:
+            if copy(f_src.fileno(), f_dst.fileno(), size) == size:
+                return name
+        except OSError as e:
+            if e.errno not in (
+                errno.EXDEV,
+                errno.ENOSYS,
+                errno.EINVAL,
+                errno.EOPNOTSUPP,
+            ):
+                raise
+        # restart from scratch for the next strategy
+        f_src.seek(0)
+        f_dst.seek(0)
+        f_dst.truncate()
+    shutil.copyfileobj(f_src, f_dst, COPY_SIZE)
+    return "copy"
+
+
+###########################################################################
+# stage: copy src to dst as cheap as the filesystem allows
+###########################################################################
+# Try in order: reflink (FICLONE), hardlink, copy_file_range, sendfile and
+# plain copy.  dst is replaced if it exists (as "cp -f").  Return the name
+# of the strategy used.  OSError is raised if all of them fail and no
+# partial dst is left behind.
+def stage(src, dst):
+    if os.path.lexists(dst):
+        if os.path.exists(dst) and os.path.samefile(src, dst):
+            print('I: stage "{}" is already "{}"'.format(dst, src), file=sys.stderr)
+            return "same"
+        os.remove(dst)
+    strategy = ""
+    with open(src, "rb") as f_src:
+        st = os.fstat(f_src.fileno())
+        # dst stays writable by us until the data is in (src may be 0444)
+        fd_dst = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        try:
+            with open(fd_dst, "wb") as f_dst:
+                try:
+                    fcntl.ioctl(f_dst.fileno(), FICLONE, f_src.fileno())
+                    strategy = "reflink"
+                except OSError:
+                    pass
+                if strategy == "":
+                    # hardlink replaces the empty file made above
+                    try:
+                        os.link(src, dst + ".debmake-stage")
+                    except OSError:
+                        pass
+                    else:
+                        try:
+                            os.replace(dst + ".debmake-stage", dst)
+                        except OSError:
+                            os.remove(dst + ".debmake-stage")
+                            raise
+                        strategy = "hardlink"
+                if strategy == "":
+                    strategy = copy_data(f_src, f_dst, st.st_size)
+            if strategy != "hardlink":
+                os.chmod(dst, stat.S_IMODE(st.st_mode))
+        except BaseException:
+            if strategy != "hardlink":
+                os.remove(dst)
+            raise
+    print('I: stage "{}" -> "{}" ({})'.format(src, dst, strategy), file=sys.stderr)
+    return strategy
+
+
+###########################################################################
+# symlink: "ln -sf target link" without the shell
+###########################################################################
+def symlink(target, link):
+    if os.path.lexists(link):
+        os.remove(link)
+    os.symlink(target, link)
+    print('I: symlink "{}" -> "{}"'.format(link, target), file=sys.stderr)
+    return
+
+
+#######################################################################
+# Test script
+#######################################################################
+if __name__ == "__main__":
+    stage("stage.py", "stage.py.tmp")
+    os.remove("stage.py.tmp")
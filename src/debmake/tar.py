@@ -22,27 +22,85 @@ CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
 TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 """
+import bz2
+import collections
+import concurrent.futures
+import gzip
+import lzma
 import os
+import shutil
 import subprocess
 import sys
+import tarfile
+import threading
+import time
 
+import debmake.timing
 import debmake.yn
 
+###########################################################################
+# Define constants
+###########################################################################
+# names excluded by "tar --exclude-vcs" (GNU tar 1.34)
+EXCLUDE_VCS = [
+    "CVS",
+    ".cvsignore",
+    "RCS",
+    "SCCS",
+    ".git",
+    ".gitignore",
+    ".gitattributes",
+    ".gitmodules",
+    ".arch-ids",
+    "{arch}",
+    "=RELEASE-ID",
+    "=meta-update",
+    "=update",
+    ".bzr",
+    ".bzrignore",
+    ".bzrtags",
+    ".hg",
+    ".hgignore",
+    ".hgtags",
+    "_darcs",
+    ".svn",
+]
+# parallel external compressors used if installed
+COMPRESSORS = {
+    "tar.gz": [["pigz", "-n", "-c"]],
+    "tar.bz2": [["lbzip2", "-c"], ["pbzip2", "-c"]],
+    "tar.xz": [["xz", "-T0", "-c"]],
+    "tar.zst": [["pzstd", "-q", "-c"], ["zstd", "-T0", "-q", "-c"]],
+}
+# uncompressed bytes per independently compressed member (in-process)
+# tar.zst has no in-process compressor and needs pzstd or zstd
+CHUNK_SIZES = {
+    "tar.gz": 1024 * 1024,  # 1 MiB
+    "tar.bz2": 900 * 1000,  # bzip2 -9 block size
+    "tar.xz": 8 * 1024 * 1024,  # 8 MiB = xz -6 dictionary size
+}
+READ_SIZE = 64 * 1024  # bytes read at once from the tar stream
 
-def tar(tarball, targz, srcdir, parent, yes):
+
+def tar(tarball, targz, srcdir, parent, yes, copy=False):
     """create a source tarball excluding the debian/ directory
     tar: called from debmake.main()
 
     tarball   = package-version.tar.gz (or package_version.orig.tar.gz)
-    targz     = one of 'tar.gz', 'tar.bz2' or 'tar.xz'
+    targz     = one of 'tar.gz', 'tar.bz2', 'tar.xz' or 'tar.zst'
     srcdir    = package-version
     parent    = parent directory name
     yes       = True if -y, False as default
+    copy      = True if -tt, False as default
 
     Please note that 'srcdir' and 'parent' are relative paths
     (specifically: the basename of the respective directory).
 
-    Side-effects:
+    If 'srcdir' differs from 'parent', the tarball is made directly from
+    'parent' with member names under 'srcdir/'.  With 'copy', 'parent' is
+    copied to 'srcdir' first (using hardlinks) as the older versions did.
+
+    Side-effects (only with 'copy'):
         * 'srcdir' will be deleted, if it already exists and is not the current
         * the current directory changes to 'srcdir' after successful completion
     """
@@ -62,6 +120,13 @@ def tar(tarball, targz, srcdir, parent, yes):
     print('I: pwd = "{}"'.format(os.getcwd()), file=sys.stderr)
     if srcdir == parent:
         print("I: good, -t (--tar) run in the versioned directory", file=sys.stderr)
+        topdir = srcdir
+    elif not copy:
+        print(
+            "I: tar {} as {} without copying it".format(parent, srcdir),
+            file=sys.stderr,
+        )
+        topdir = parent
     else:
         if os.path.isdir(srcdir):
             debmake.yn.yn(
@@ -77,36 +142,158 @@ def tar(tarball, targz, srcdir, parent, yes):
             srcdir,
         ]
         print("I: $ {}".format(" ".join(copy_command)), file=sys.stderr)
-        if subprocess.call(copy_command) != 0:
+        if debmake.timing.call(copy_command) != 0:
             print("E: rsync -aCv failed.", file=sys.stderr)
             exit(1)
+        topdir = srcdir
     # tar while excluding VCS and debian directories
-    tar_command = [
-        "tar",
-        "--exclude",
-        os.path.join(srcdir, "debian"),
-        "--anchored",
-        "--exclude-vcs",
-    ]
+    if targz not in COMPRESSORS.keys():
+        print('E: Wrong file format "{}".'.format(targz), file=sys.stderr)
+        exit(1)
+    print(
+        "I: tar {} --exclude {} --anchored --exclude-vcs (in process)".format(
+            srcdir, os.path.join(srcdir, "debian")
+        ),
+        file=sys.stderr,
+    )
+    tar_file(tarball, targz, srcdir, topdir=topdir)
+    print("I: {} tarball made".format(tarball), file=sys.stderr)
+    os.chdir(topdir)
+    print('I: pwd = "{}"'.format(os.getcwd()), file=sys.stderr)
+    return
+
+
+###########################################################################
+# tar filter: --exclude srcdir/debian --anchored --exclude-vcs
+###########################################################################
+def exclude_filter(srcdir, counter):
+    def filter(tarinfo):
+        if tarinfo.name == os.path.join(srcdir, "debian"):
+            return None
+        elif os.path.basename(tarinfo.name) in EXCLUDE_VCS:
+            return None
+        counter["files"] += 1
+        return tarinfo
+
+    return filter
+
+
+###########################################################################
+# compress one chunk as an independent gzip/bzip2/xz member
+###########################################################################
+# Concatenated members form a valid multi-member .gz/.bz2/.xz file.
+def compress_chunk(data, targz):
     if targz == "tar.gz":
-        tar_command.append("--gzip")
+        return gzip.compress(data, mtime=0)
     elif targz == "tar.bz2":
-        tar_command.append("--bzip2")
-    elif targz == "tar.xz":
-        tar_command.append("--xz")
+        return bz2.compress(data)
     else:
-        print('E: Wrong file format "{}".'.format(targz), file=sys.stderr)
+        return lzma.compress(data)
+
+
+###########################################################################
+# compress the tar stream read from rfd and write it to output
+###########################################################################
+# Chunks are compressed over a thread pool (zlib, bz2 and lzma release
+# the GIL) or piped to the parallel external compressor command.
+def compress_stream(rfd, output, targz, command, counter):
+    with os.fdopen(rfd, "rb") as input:
+        if command:
+            with debmake.timing.command_phase(command):
+                proc = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=output)
+                try:
+                    while True:
+                        data = input.read(READ_SIZE)
+                        if not data:
+                            break
+                        counter["bytes"] += len(data)
+                        proc.stdin.write(data)
+                    proc.stdin.close()
+                except BrokenPipeError:
+                    pass  # reported below
+                returncode = proc.wait()
+            if returncode != 0:
+                raise OSError("{} failed".format(" ".join(command)))
+            return
+        jobs = os.cpu_count() or 1
+        chunk_size = CHUNK_SIZES[targz]
+        futures = collections.deque()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+            while True:
+                data = input.read(chunk_size)
+                if data:
+                    counter["bytes"] += len(data)
+                    futures.append(executor.submit(compress_chunk, data, targz))
+                # keep at most 2 * jobs chunks in memory and write in order
+                while futures and (len(futures) > 2 * jobs or not data):
+                    output.write(futures.popleft().result())
+                if not data:
+                    break
+    return
+
+
+###########################################################################
+# make tarball of srcdir in process with parallel compression
+###########################################################################
+# topdir: directory to be archived as srcdir (default: srcdir)
+def tar_file(tarball, targz, srcdir, topdir=""):
+    command = []
+    for candidate in COMPRESSORS[targz]:
+        if shutil.which(candidate[0]):
+            command = candidate
+            break
+    if command:
+        print("I: compress with $ {}".format(" ".join(command)), file=sys.stderr)
+    elif targz not in CHUNK_SIZES.keys():
+        print("E: no compressor found for {}.".format(targz), file=sys.stderr)
         exit(1)
-    tar_command.append("-cvf")
-    tar_command.append(tarball)
-    tar_command.append(srcdir)
-    print("I: $ {}".format(" ".join(tar_command)), file=sys.stderr)
-    if subprocess.call(tar_command) != 0:
-        print("E: tar failed {}.".format(tarball), file=sys.stderr)
+    else:
+        print(
+            "I: compress with {} threads".format(os.cpu_count() or 1), file=sys.stderr
+        )
+    counter = {"files": 0, "bytes": 0}
+    errors = []
+    start = time.monotonic()
+    (rfd, wfd) = os.pipe()
+    with open(tarball, "wb") as output:
+
+        def compressor():
+            try:
+                compress_stream(rfd, output, targz, command, counter)
+            except Exception as e:
+                errors.insert(0, e)  # the cause of errors in tar.add()
+
+        thread = threading.Thread(target=compressor, name="compressor")
+        thread.start()
+        try:
+            with os.fdopen(wfd, "wb") as stream:
+                with tarfile.open(
+                    fileobj=stream, mode="w|", format=tarfile.GNU_FORMAT
+                ) as tar:
+                    tar.add(
+                        topdir or srcdir,
+                        arcname=srcdir,
+                        filter=exclude_filter(srcdir, counter),
+                    )
+        except Exception as e:
+            errors.append(e)
+        finally:
+            thread.join()
+    if errors:
+        print("E: tar failed {}: {}".format(tarball, errors[0]), file=sys.stderr)
         exit(1)
-    print("I: {} tarball made".format(tarball), file=sys.stderr)
-    os.chdir(srcdir)
-    print('I: pwd = "{}"'.format(os.getcwd()), file=sys.stderr)
+    elapsed = max(time.monotonic() - start, 1e-6)
+    size = os.path.getsize(tarball)
+    print(
+        "I: {} files, {:.1f} MiB compressed to {:.1f} MiB in {:.2f} s ({:.1f} MiB/s)".format(
+            counter["files"],
+            counter["bytes"] / 1048576,
+            size / 1048576,
+            elapsed,
+            counter["bytes"] / 1048576 / elapsed,
+        ),
+        file=sys.stderr,
+    )
     return
 
 
@@ -0,0 +1,215 @@
+#!/usr/bin/python3
+# vim:se tw=0 sts=4 ts=4 et ai:
+"""
+Copyright © 2024 Osamu Aoki
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the
+"Software"), to deal in the Software without restriction, including
+without limitation the rights to use, copy, modify, merge, publish,
+distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to
+the following conditions:
+
+The above copyright notice and this permission notice shall be included
+in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+import atexit
+import contextlib
+import json
+import resource
+import subprocess
+import sys
+import threading
+import time
+
+###################################################################
+# Per-phase timing report for --timings
+###################################################################
+# Each phase records its wall time, CPU time of this process, CPU time of
+# reaped child processes (external commands, pool workers) and the peak
+# RSS so far of this process and of its largest child.  The peak RSS is
+# the high-water mark since the start of the process (ru_maxrss) at the
+# end of the phase, not the peak within the phase.  Phases nest in
+# the main thread.  A phase run in a helper thread (e.g. the tree walk of
+# scanfiles.iter_ahead()) is placed under the main thread phase running
+# at its start and its CPU time is the CPU time of the thread.
+###################################################################
+TIMINGS_VERSION = 1  # bump if the JSON report format changes
+PHASE_WIDTH = 48  # chars of the phase column (and of command labels)
+
+timings = {
+    "enabled": False,
+    "file": "",
+    "stack": [],  # open phases of the main thread
+    "records": [],
+}
+
+
+def enable(file=""):
+    # file: also write the report as JSON to this file
+    timings["enabled"] = True
+    timings["file"] = file
+    timings["start"] = usage()
+    atexit.register(report)
+    return
+
+
+def enabled():
+    return timings["enabled"]
+
+
+def usage():
+    self = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return {
+        "wall": time.monotonic(),
+        "cpu": self.ru_utime + self.ru_stime,
+        "thread_cpu": time.thread_time(),
+        "children_cpu": children.ru_utime + children.ru_stime,
+        "maxrss": self.ru_maxrss,  # KiB
+        "children_maxrss": children.ru_maxrss,  # KiB
+    }
+
+
+def record(path, start, end, thread=False):
+    if thread:
+        cpu = end["thread_cpu"] - start["thread_cpu"]
+    else:
+        cpu = end["cpu"] - start["cpu"]
+    return {
+        "phase": "/".join(path),
+        "depth": len(path) - 1,
+        "start": round(start["wall"] - timings["start"]["wall"], 6),
+        "wall": round(end["wall"] - start["wall"], 6),
+        "cpu": round(cpu, 6),
+        "children_cpu": round(end["children_cpu"] - start["children_cpu"], 6),
+        "maxrss_mib": round(end["maxrss"] / 1024, 1),
+        "children_maxrss_mib": round(end["children_maxrss"] / 1024, 1),
+        "thread": thread,
+    }
+
+
+@contextlib.contextmanager
+def timed_phase(name):
+    thread = threading.current_thread() is not threading.main_thread()
+    path = timings["stack"] + [name]
+    if not thread:
+        timings["stack"].append(name)
+    start = usage()
+    try:
+        yield
+    finally:
+        if not thread:
+            timings["stack"].pop()
+        timings["records"].append(record(path, start, usage(), thread=thread))
+    return
+
+
+def phase(name):
+    # return context manager timing the phase name (no-op if not enabled)
+    if not timings["enabled"]:
+        return contextlib.nullcontext()
+    return timed_phase(name)
+
+
+def command_phase(command):
+    # return phase for the external command (string or list)
+    if not isinstance(command, str):
+        command = " ".join(command)
+    label = "$ " + command
+    if len(label) > PHASE_WIDTH:
+        label = label[: PHASE_WIDTH - 3] + "..."
+    return phase(label)
+
+
+def call(command, **kwargs):
+    # subprocess.call() timed as a phase
+    with command_phase(command):
+        return subprocess.call(command, **kwargs)
+
+
+def report():
+    # print the timing table and write the JSON report (once at exit)
+    if not timings["enabled"]:
+        return
+    timings["enabled"] = False
+    total = record(["total"], timings["start"], usage())
+    records = sorted(timings["records"], key=lambda r: (r["start"], -r["wall"]))
+    print(
+        "I: {:<{}} {:>9} {:>9} {:>9} {:>10} {:>8}".format(
+            "timings (thread*)",
+            PHASE_WIDTH,
+            "wall s",
+            "cpu s",
+            "child s",
+            "maxrss MiB",
+            "child",
+        ),
+        file=sys.stderr,
+    )
+    for r in records + [total]:
+        label = "  " * r["depth"] + r["phase"].split("/")[-1]
+        if r["thread"]:
+            label += "*"
+        label = label[:PHASE_WIDTH]
+        print(
+            "I: {:<{}} {:>9.3f} {:>9.3f} {:>9.3f} {:>10.1f} {:>8.1f}".format(
+                label,
+                PHASE_WIDTH,
+                r["wall"],
+                r["cpu"],
+                r["children_cpu"],
+                r["maxrss_mib"],
+                r["children_maxrss_mib"],
+            ),
+            file=sys.stderr,
+        )
+    if timings["file"]:
+        data = {
+            "version": TIMINGS_VERSION,
+            "argv": sys.argv,
+            "total": total,
+            "phases": records,
+        }
+        try:
+            with open(timings["file"], mode="w", encoding="utf-8") as f:
+                json.dump(data, f, indent=1)
+                f.write("\n")
+        except OSError as e:
+            print(
+                "W: timings not written: {}: {}".format(timings["file"], e),
+                file=sys.stderr,
+            )
+        else:
+            print("I: timings written to {}".format(timings["file"]), file=sys.stderr)
+    return
+
+
+#######################################################################
+# Test script
+#######################################################################
+if __name__ == "__main__":
+    enable()
+    with phase("outer"):
+        with phase("sleep"):
+            time.sleep(0.1)
+        call(["true"])
+
+        def helper():
+            with phase("helper"):
+                sum(range(1000000))
+
+        thread = threading.Thread(target=helper)
+        thread.start()
+        with phase("busy"):
+            sum(range(1000000))
+        thread.join()
@@ -23,10 +23,15 @@ TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 """
 import os
+import re
+import shutil
 import subprocess
 import sys
+import debmake.timing
 import debmake.yn
 
+re_subpath = re.compile(r"/.")  # not a first level entry
+
 
 ###########################################################################
 # untar: called from debmake.main()
@@ -57,38 +62,39 @@ def untar(tarball, targz, srcdir, dist, tar, parent, yes=False):
             )
         # setup command line
         if targz == "tar.bz2":
-            command = "tar --bzip2 -xvf "
-            commandx = "tar --bzip2 -tf "
+            command = ["tar", "--bzip2", "-xvf"]
         elif targz == "tar.xz":
-            command = "tar --xz -xvf "
-            commandx = "tar --xz -tf "
+            command = ["tar", "--xz", "-xvf"]
         elif targz == "tar.gz":
-            command = "tar -xvzf "
-            commandx = "tar -tzf "
+            command = ["tar", "-xvzf"]
+        elif targz == "tar.zst":
+            # pzstd decompresses multi-frame tar.zst (made by pzstd) in parallel
+            if shutil.which("pzstd"):
+                command = ["tar", "--use-compress-program=pzstd", "-xvf"]
+            else:
+                command = ["tar", "--use-compress-program=zstd -T0", "-xvf"]
         else:
             print('E: the extension "{}" not supported.'.format(targz), file=sys.stderr)
             exit(1)
-        command += tarball
-        print("I: $ {}".format(command), file=sys.stderr)
-        if subprocess.call(command, shell=True) != 0:
+        command.append(tarball)
+        print("I: $ {}".format(" ".join(command)), file=sys.stderr)
+        # pick first level entries (as "grep -v /.") from the verbose listing
+        # while extracting instead of listing the tarball again with "tar -tf"
+        tarsrcdirs = []
+        with debmake.timing.command_phase(command), subprocess.Popen(
+            command, stdout=subprocess.PIPE, universal_newlines=True
+        ) as proc:
+            for line in proc.stdout:
+                sys.stdout.write(line)
+                if not re_subpath.search(line):
+                    tarsrcdirs.append(line.rstrip("\n"))
+        if proc.returncode != 0:
             print("E: failed to untar.", file=sys.stderr)
             exit(1)
         print("I: untared {}.".format(tarball), file=sys.stderr)
         # rename source directory
-        commandx += tarball + "|grep -v /."
-        print("I: {}".format(commandx), file=sys.stderr)
-        try:
-            tarsrcdirs = (
-                subprocess.check_output(commandx, shell=True, universal_newlines=True)
-                .strip()
-                .split("\n")
-            )
-        except subprocess.CalledProcessError as exc:
-            print(
-                "E: failed to list the stem directory of tar: {}".format(exc),
-                file=sys.stderr,
-            )
-            exit(1)
+        if tarsrcdirs == []:
+            tarsrcdirs = [""]
         # tailing / may or may not exist.
         if len(tarsrcdirs) > 1:
             print(
@@ -109,7 +115,7 @@ def untar(tarball, targz, srcdir, dist, tar, parent, yes=False):
             )
             command = "mv -f " + tarsrcdir + " " + srcdir
             print("I: $ {}".format(command), file=sys.stderr)
-            if subprocess.call(command, shell=True) != 0:
+            if debmake.timing.call(command, shell=True) != 0:
                 print("E: failed to move directory.", file=sys.stderr)
                 exit(1)
     # copy debian/* for -d
@@ -117,7 +123,7 @@ def untar(tarball, targz, srcdir, dist, tar, parent, yes=False):
         command = "cp -drl " + parent + "/debian " + srcdir + "/debian"
         # execute command: copy debian tree (with hardlink)
         print("I: $ {}".format(command), file=sys.stderr)
-        if subprocess.call(command, shell=True) != 0:
+        if debmake.timing.call(command, shell=True) != 0:
             print("E: cp -drl failed.", file=sys.stderr)
             exit(1)
     # cd srcdir
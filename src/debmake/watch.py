@@ -0,0 +1,395 @@
+#!/usr/bin/python3
+# vim:se tw=0 sts=4 ts=4 et ai:
+"""
+Copyright © 2024 Osamu Aoki
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the
+"Software"), to deal in the Software without restriction, including
+without limitation the rights to use, copy, modify, merge, publish,
+distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to
+the following conditions:
+
+The above copyright notice and this permission notice shall be included
+in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+import debmake.checkdep5
+import debmake.copyright
+import debmake.debug
+import debmake.scanfiles
+
+###################################################################
+# Watch the source tree and keep the debmake -c output updated
+###################################################################
+# After one full scan, only files reported changed by inotify(7) (or by
+# polling the tree if inotify is not available) are parsed again and
+# only the license groups of bunch_all_licenses() they leave or join are
+# bunched again.
+###################################################################
+POLL_INTERVAL = 1.0  # seconds between polls of the tree without inotify
+SETTLE_TIME = 0.1  # seconds to wait for more events after the first one
+READ_SIZE = 64 * 1024  # bytes of inotify events read at once
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+###################################################################
+# Walk directories as scanfiles.iter_all_files()
+###################################################################
+def walk_dirs(top=""):
+    # yield (dirpath, file_entries) under top without VCS and symlink dirs
+    for dirpath, subdirs, dir_files in debmake.scanfiles.walk_entries(top=top):
+        yield (dirpath, dir_files)
+        subdirs[:] = [
+            subdir
+            for subdir in subdirs
+            if subdir.name not in debmake.scanfiles.VCS_DIRS
+            and not subdir.is_symlink()
+        ]
+    return
+
+
+def skipped(path, output):
+    # True if path is not scanned by scanfiles.iter_all_files()
+    # output: files written by watch() itself
+    (dir, file) = os.path.split(path)
+    return (
+        path in output
+        or path == "debian/copyright"
+        or file in debmake.scanfiles.SKIP_FILES
+        or bool(set(dir.split("/")) & set(debmake.scanfiles.VCS_DIRS))
+    )
+
+
+###################################################################
+# inotify(7) via ctypes
+###################################################################
+def inotify_open():
+    # return watcher (dictionary) or None if inotify is not available
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        fd = libc.inotify_init1(os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    watcher = {}
+    watcher["libc"] = libc
+    watcher["fd"] = fd
+    watcher["wds"] = {}  # watch descriptor -> dirpath
+    return watcher
+
+
+def inotify_add(watcher, top=""):
+    # watch top and all directories under it
+    for dirpath, _ in walk_dirs(top):
+        wd = watcher["libc"].inotify_add_watch(
+            watcher["fd"], os.fsencode(dirpath or "."), WATCH_MASK
+        )
+        if wd < 0:
+            print(
+                "W: inotify_add_watch {}: {}".format(
+                    dirpath or ".", os.strerror(ctypes.get_errno())
+                ),
+                file=sys.stderr,
+            )
+        else:
+            watcher["wds"][wd] = dirpath
+    return
+
+
+def inotify_remove(watcher, top):
+    # stop watching top and all directories under it
+    for wd, dirpath in list(watcher["wds"].items()):
+        if dirpath == top or dirpath.startswith(top + "/"):
+            watcher["libc"].inotify_rm_watch(watcher["fd"], wd)
+            del watcher["wds"][wd]
+    return
+
+
+def inotify_wait(watcher):
+    # return set of changed paths (None if events are lost)
+    changed = set()
+    overflow = False
+    timeout = None
+    while select.select([watcher["fd"]], [], [], timeout)[0]:
+        timeout = SETTLE_TIME
+        data = os.read(watcher["fd"], READ_SIZE)
+        i = 0
+        while i < len(data):
+            (wd, mask, _, length) = EVENT.unpack_from(data, i)
+            name = data[i + EVENT.size : i + EVENT.size + length].rstrip(b"\0")
+            i += EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+                continue
+            if mask & IN_IGNORED:
+                watcher["wds"].pop(wd, None)
+                continue
+            if wd not in watcher["wds"]:
+                continue
+            path = os.path.join(watcher["wds"][wd], os.fsdecode(name))
+            if mask & IN_ISDIR:
+                if mask & (IN_DELETE | IN_MOVED_FROM):
+                    inotify_remove(watcher, path)
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    inotify_add(watcher, path)
+            changed.add(path)
+    if overflow:
+        return None
+    return changed
+
+
+###################################################################
+# Polling fallback
+###################################################################
+def poll_tree():
+    # return {path: (mtime, size, inode)} of all files
+    stats = {}
+    for dirpath, dir_files in walk_dirs():
+        for entry in dir_files:
+            try:
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            stats[os.path.join(dirpath, entry.name)] = (
+                st.st_mtime_ns,
+                st.st_size,
+                st.st_ino,
+            )
+    return stats
+
+
+def poll_wait(stats):
+    # return set of changed paths since stats (updated in place)
+    while True:
+        time.sleep(POLL_INTERVAL)
+        new_stats = poll_tree()
+        changed = {
+            path
+            for path in stats.keys() | new_stats.keys()
+            if stats.get(path) != new_stats.get(path)
+        }
+        if changed:
+            stats.clear()
+            stats.update(new_stats)
+            return changed
+
+
+###################################################################
+# Incremental copyright scan
+###################################################################
+def new_state(mode, pedantic, output):
+    state = {}
+    state["mode"] = mode
+    state["pedantic"] = pedantic
+    state["output"] = output
+    state["kinds"] = {}  # file -> kind of scanfiles.iter_all_files()
+    state["licenses"] = {}  # md5hashkey -> classified license (see sdata)
+    state["adata"] = {}  # file -> adata item
+    state["groups"] = {}  # md5hashkey -> {file: adata item}
+    state["bdata"] = {}  # md5hashkey -> bdata item
+    return state
+
+
+def add_licenses(state, sdata):
+    # render sdata of checkdep5.scan_all_licenses() and return changed keys
+    state["licenses"].update(sdata["licenses"])
+    licenses = {}
+    for _, md5hashkey, _ in sdata["files"]:
+        if md5hashkey in state["licenses"]:
+            licenses[md5hashkey] = state["licenses"][md5hashkey]
+    adata = debmake.checkdep5.license_all_files(
+        {"files": sdata["files"], "licenses": licenses, "debug": sdata["debug"]},
+        mode=state["mode"],
+        pedantic=state["pedantic"],
+    )
+    dirty = set()
+    for item in adata:
+        (md5hashkey, _, _, _, file) = item
+        state["adata"][file] = item
+        state["groups"].setdefault(md5hashkey, {})[file] = item
+        dirty.add(md5hashkey)
+    return dirty
+
+
+def remove_file(state, file):
+    # forget file and return changed keys
+    state["kinds"].pop(file, None)
+    item = state["adata"].pop(file, None)
+    if item is None:
+        return set()
+    md5hashkey = item[0]
+    del state["groups"][md5hashkey][file]
+    return {md5hashkey}
+
+
+def bunch_groups(state, dirty):
+    # bunch_all_licenses() only for the license groups with changed files
+    for md5hashkey in dirty:
+        group = state["groups"].get(md5hashkey)
+        if group:
+            state["bdata"][md5hashkey] = debmake.checkdep5.bunch_license(
+                list(group.values())
+            )
+        else:
+            state["groups"].pop(md5hashkey, None)
+            state["bdata"].pop(md5hashkey, None)
+    return
+
+
+def update_paths(state, paths):
+    # parse changed paths again and return the number of files checked
+    files = set()
+    for path in paths:
+        files.add(path)
+        # files under a removed, moved or created directory
+        prefix = path + "/"
+        files.update(file for file in state["kinds"] if file.startswith(prefix))
+        if os.path.isdir(path) and not os.path.islink(path):
+            for dirpath, dir_files in walk_dirs(path):
+                files.update(os.path.join(dirpath, entry.name) for entry in dir_files)
+    dirty = set()
+    text_files = []
+    contents = {}
+    for file in sorted(files):
+        dirty |= remove_file(state, file)
+        if skipped(file, state["output"]):
+            continue
+        try:
+            if os.path.islink(file) or not os.path.isfile(file):
+                continue
+            (kind, buff, size) = debmake.scanfiles.kind_of_file(file)
+        except OSError:
+            continue  # removed again
+        state["kinds"][file] = kind
+        if kind == "nonlink":
+            if len(buff) == size:
+                contents[file] = buff
+            text_files.append(file)
+    if text_files:
+        sdata = debmake.checkdep5.scan_all_licenses(
+            text_files,
+            pedantic=state["pedantic"],
+            contents=contents,
+            known=state["licenses"],
+        )
+        dirty |= add_licenses(state, sdata)
+    bunch_groups(state, dirty)
+    return len(files)
+
+
+def write_copyright(state, file, tutorial=False):
+    kinds = state["kinds"]
+    text = debmake.copyright.copyright(
+        "package",
+        set(),
+        debmake.checkdep5.format_all_licenses(list(state["bdata"].values())),
+        sorted(f for f in kinds if kinds[f] == "xml_html"),
+        sorted(f for f in kinds if kinds[f] == "binary"),
+        sorted(f for f in kinds if kinds[f] == "huge"),
+        mode=state["mode"],
+        tutorial=tutorial,
+    )
+    tmp = file + ".tmp"
+    with open(tmp, mode="w", encoding="utf-8") as f:
+        print(text, file=f)
+    os.replace(tmp, file)
+    return
+
+
+#######################################################################
+# debmake -c --watch file
+#######################################################################
+def watch(para):
+    file = para["watch"]
+    if para["tarball"]:
+        print("E: --watch can not be used with -a", file=sys.stderr)
+        exit(1)
+    output = {os.path.relpath(file), os.path.relpath(file + ".tmp")}
+    state = new_state(para["copyright"], para["pedantic"], output)
+    # start watching before the full scan not to miss changes during it
+    watcher = inotify_open()
+    if watcher is None:
+        print(
+            "I: inotify not available, poll the tree every {} s".format(POLL_INTERVAL),
+            file=sys.stderr,
+        )
+        stats = poll_tree()
+    else:
+        inotify_add(watcher)
+    scan = debmake.scanfiles.new_scan()
+    contents = {}  # small files read once while walking
+    sdata = debmake.checkdep5.checkdep5_scan(
+        debmake.scanfiles.scan_tree(scan, contents=contents),
+        mode=state["mode"],
+        pedantic=para["pedantic"],
+        jobs=para["jobs"],
+        cache=para["cache"],
+        verify=para["cache_verify"],
+        contents=contents,
+    )
+    debmake.scanfiles.scan_report(scan)
+    for kind in ["nonlink", "xml_html", "binary", "huge"]:
+        for f in scan[kind + "_files"]:
+            state["kinds"][f] = kind
+    bunch_groups(state, add_licenses(state, sdata))
+    for f in output:
+        bunch_groups(state, remove_file(state, f))
+    write_copyright(state, file, tutorial=para["tutorial"])
+    print(
+        "I: watch the source tree, write {} (Ctrl-C to stop)".format(file),
+        file=sys.stderr,
+    )
+    try:
+        while True:
+            if watcher is None:
+                paths = poll_wait(stats)
+            else:
+                paths = inotify_wait(watcher)
+                if paths is None:
+                    print("W: inotify events lost, check all files", file=sys.stderr)
+                    paths = set(state["kinds"]) | set(poll_tree())
+            paths = {os.path.normpath(path) for path in paths} - output
+            if not paths:
+                continue
+            start = time.monotonic()
+            count = update_paths(state, paths)
+            write_copyright(state, file, tutorial=para["tutorial"])
+            print(
+                "I: updated {} for {} changed files in {:.3f} s".format(
+                    file, count, time.monotonic() - start
+                ),
+                file=sys.stderr,
+            )
+    except KeyboardInterrupt:
+        print("\nI: stop watching", file=sys.stderr)
+    finally:
+        if watcher is not None:
+            os.close(watcher["fd"])
+    return
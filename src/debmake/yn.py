@@ -23,8 +23,8 @@ TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 """
 import os
-import subprocess
 import sys
+import debmake.timing
 
 
 ###########################################################################
@@ -44,7 +44,7 @@ def yn(mes, command, yes):
     if yn == "y":
         if command:
             print("I: $ {}".format(command), file=sys.stderr)
-            if subprocess.call(command, shell=True) != 0:
+            if debmake.timing.call(command, shell=True) != 0:
                 print("E: failed to run command.", file=sys.stderr)
                 exit(1)
     else: